@@ -0,0 +1,446 @@
+"""Cache backends for catalog responses and other hot lookups.
+
+Two interchangeable backends implement `CacheBackend`:
+
+- `MemoryCacheBackend`: process-local LRU with TTL (the default)
+- `RedisCacheBackend`: shared across instances through `REDIS_URL`, so a
+  scaled-out deployment warms and invalidates one cache
+
+The interface is sync because most callers are handlers wrapped with
+`run_in_session`. Those run in a greenlet on the event loop, so the Redis
+backend sends its network calls to the threadpool from there; async code
+outside a handler uses `get_async`.
+
+Select with `CACHE_BACKEND=memory|redis`. Each cache has its own namespace.
+
+Entries carry tags so the admin write endpoints can invalidate precisely:
+
+- ``product:<id>``       the single-product response for that id
+- ``category:<name>``    listings filtered by that exact category
+- ``catalog``            anything that can change on any product write
+                         (unfiltered listings, featured, category list)
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlencode
+import hashlib
+import logging
+import threading
+import time
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Interface shared by the cache backends. Values are bytes."""
+
+    namespace: str
+    ttl: float
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        """`get` for async code; never blocks the event loop"""
+        return self.get(key)
+
+    def set(self, key: str, value: bytes, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of `tags`; returns the number dropped"""
+        raise NotImplementedError
+
+    def clear(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, object]:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Bounded LRU with per-entry TTL, local to this process"""
+
+    def __init__(self, namespace: str, ttl: float = 60.0, max_entries: int = 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, value, tags)
+        self._entries: "OrderedDict[str, Tuple[float, bytes, frozenset]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _drop(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        if not self.enabled:
+            return
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            doomed = set()
+            for tag in tags:
+                doomed.update(self._tags.get(tag, ()))
+            for key in doomed:
+                self._drop(key)
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self.invalidations += dropped
+            return dropped
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis-backed cache shared by every instance.
+
+    Keys are ``<namespace>:k:<key>`` and each tag is a set ``<namespace>:t:<tag>``
+    of keys. Eviction is left to
+    Redis (TTL plus its maxmemory policy). Redis errors are counted and
+    treated as misses so an outage degrades to uncached reads.
+
+    Every client call goes through `_call`: inside a `run_in_session`
+    handler (a greenlet on the event loop) it runs in the threadpool and the
+    handler waits for it the way it waits for a query; in a worker thread it
+    runs directly.
+
+    Pass `client` to use an existing client (e.g. ``fakeredis.FakeRedis()``).
+    """
+
+    def __init__(self, namespace: str, ttl: float = 60.0, url: Optional[str] = None, client=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:k:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.namespace}:t:{tag}"
+
+    def _error(self, action: str, error: Exception):
+        self.errors += 1
+        logger.warning(f"Redis cache {action} failed ({self.namespace}): {error}")
+
+    def _call(self, fn, *args):
+        """Run blocking client work without holding up the event loop"""
+        if in_greenlet():
+            return await_only(run_in_threadpool(fn, *args))
+        return fn(*args)
+
+    def _count(self, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(self._key(key))
+        except Exception as e:
+            self._error("get", e)
+            return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        return self._count(self._call(self._get, key))
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        return self._count(await run_in_threadpool(self._get, key))
+
+    def _set(self, key: str, value: bytes, tags: List[str], ttl_ms: int):
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(self._key(key), value, px=ttl_ms)
+            for tag in tags:
+                # Tag sets outlive their entries by one TTL; stale members are harmless
+                pipe.sadd(self._tag(tag), key)
+                pipe.pexpire(self._tag(tag), ttl_ms * 2)
+            pipe.execute()
+        except Exception as e:
+            self._error("set", e)
+
+    def set(self, key: str, value: bytes, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        if not self.enabled:
+            return
+        self._call(self._set, key, value, list(tags), int((ttl or self.ttl) * 1000))
+
+    def _delete(self, key: str):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            self._error("delete", e)
+
+    def delete(self, key: str):
+        self._call(self._delete, key)
+
+    def _invalidate(self, tags: List[str]) -> int:
+        try:
+            keys = set()
+            for tag in tags:
+                keys.update(self.client.smembers(self._tag(tag)))
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self._key(key.decode() if isinstance(key, bytes) else key))
+            pipe.delete(*[self._tag(tag) for tag in tags])
+            pipe.execute()
+        except Exception as e:
+            self._error("invalidate", e)
+            return 0
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        if not tags:
+            return 0
+        return self._call(self._invalidate, tags)
+
+    def _clear(self) -> int:
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.namespace}:*", count=500))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self._error("clear", e)
+            return 0
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        return self._call(self._clear)
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+        }
+
+
+# Every cache created by create_cache, for /metrics
+caches: List[CacheBackend] = []
+
+
+def create_cache(namespace: str, ttl: float, max_entries: int = 1024) -> CacheBackend:
+    """Build the configured backend (CACHE_BACKEND), falling back to memory if Redis is unavailable"""
+    cache = None
+    if settings.cache_backend.lower() == "redis":
+        try:
+            cache = RedisCacheBackend(namespace, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"Could not create Redis cache '{namespace}', using in-process cache: {e}")
+    if cache is None:
+        cache = MemoryCacheBackend(namespace, ttl=ttl, max_entries=max_entries)
+    caches.append(cache)
+    return cache
+
+
+# Catalog responses from the products router
+catalog_cache = create_cache(
+    "catalog",
+    ttl=settings.catalog_cache_ttl,
+    max_entries=settings.catalog_cache_max_entries,
+)
+
+# User id -> role, for admin checks
+role_cache = create_cache("role", ttl=settings.role_cache_ttl, max_entries=10000)
+
+# Catalog version fingerprint used for ETags
+version_cache = create_cache("catalog-version", ttl=settings.catalog_version_ttl, max_entries=1)
+
+
+def catalog_key(endpoint: str, base_url: str, **params) -> str:
+    """Normalized cache key: unset params dropped, strings trimmed, order fixed.
+
+    The request base URL is part of the key because image URLs are resolved
+    against it.
+    """
+    normalized = []
+    for name, value in sorted(params.items()):
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        normalized.append((name, value))
+    return f"{endpoint}|{base_url}|{urlencode(normalized)}"
+
+
+def _category_tags(categories: Iterable[Optional[str]]) -> List[str]:
+    return [f"category:{c}" for c in categories if c]
+
+
+def invalidate_product(product_id: str, categories: Iterable[Optional[str]] = ()) -> int:
+    """Invalidate after a write to one product.
+
+    Drops the product's own entry, every catalog-wide entry, and listings
+    filtered by any of `categories` (pass both the old and new category
+    when it changes).
+    """
+    bump_catalog_version()
+    return catalog_cache.invalidate_tags(["catalog", f"product:{product_id}"] + _category_tags(categories))
+
+
+def invalidate_category(category: str) -> int:
+    """Invalidate listings that could include products in `category`"""
+    bump_catalog_version()
+    return catalog_cache.invalidate_tags(["catalog"] + _category_tags([category]))
+
+
+def invalidate_all() -> int:
+    bump_catalog_version()
+    return catalog_cache.clear()
+
+
+# Conditional requests
+
+def _stamp(value) -> str:
+    return value.isoformat() if hasattr(value, "isoformat") else str(value or 0)
+
+
+def catalog_version(db) -> str:
+    """Fingerprint of the catalog: product count, max(updated_at) and the
+    featured ranking's computed_at.
+
+    Memoized in `version_cache` for CATALOG_VERSION_TTL seconds, so most
+    conditional requests are answered without touching the database. Admin
+    writes drop the memo; writes through other instances show up once it
+    expires (immediately with the Redis backend, where the memo is shared).
+    """
+    cached = version_cache.get("version")
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    from sqlalchemy import func
+    from app.models import FeaturedProduct, Product as ProductModel
+
+    featured_at = db.query(func.max(FeaturedProduct.computed_at)).scalar_subquery()
+    count, last_updated, last_featured = db.query(
+        func.count(ProductModel.id), func.max(ProductModel.updated_at), featured_at
+    ).one()
+    version = f"{count}-{_stamp(last_updated)}-{_stamp(last_featured)}"
+    version_cache.set("version", version.encode("utf-8"))
+    return version
+
+
+def bump_catalog_version():
+    version_cache.delete("version")
+
+
+def make_etag(version: str, key: str) -> str:
+    """Strong ETag for the response identified by cache `key` at catalog `version`"""
+    digest = hashlib.sha1(f"{version}|{key}".encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag`"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,72 @@
+"""Materialized product categories.
+
+The `categories` table holds one row per category name with a stable id
+and a product count. Rows are created the first time a category is used
+and are never renumbered; categories whose count drops to zero are hidden
+rather than deleted, so ids stay stable if they come back.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+
+from app.database import upsert
+from app.models import Category as CategoryModel, Product as ProductModel
+
+
+def sync_categories(db):
+    """Recompute every category's product count from the products table, adding missing categories"""
+    counts = dict(
+        db.query(ProductModel.category, func.count(ProductModel.id))
+        .filter(ProductModel.category.isnot(None), ProductModel.category != "")
+        .group_by(ProductModel.category)
+        .all()
+    )
+    existing = {category.name: category for category in db.query(CategoryModel).all()}
+    for name, category in existing.items():
+        category.product_count = counts.get(name, 0)
+    for name in sorted(set(counts) - set(existing)):
+        db.add(CategoryModel(name=name, description=f"Products in {name} category", product_count=counts[name]))
+    db.commit()
+
+
+def _adjust(db, name: Optional[str], delta: int):
+    if not name:
+        return
+    if delta < 0:
+        db.query(CategoryModel).filter(CategoryModel.name == name).update(
+            {CategoryModel.product_count: CategoryModel.product_count + delta}, synchronize_session=False
+        )
+        return
+    # Two writers adding the first product of a new category must not both INSERT it
+    upsert(
+        db, CategoryModel,
+        {"name": name, "description": f"Products in {name} category", "product_count": delta},
+        ["name"],
+        {"product_count": CategoryModel.product_count + delta, "updated_at": datetime.utcnow()},
+    )
+
+
+def adjust_category_counts(db, old: Optional[str], new: Optional[str]):
+    """Move one product from category `old` to `new`; call before committing the product write.
+
+    Pass None for `old` on create and for `new` on delete. Does nothing
+    until the table has been backfilled, which `list_categories` does on
+    first use.
+    """
+    if old == new or db.query(CategoryModel.id).first() is None:
+        return
+    _adjust(db, old, -1)
+    _adjust(db, new, 1)
+
+
+def list_categories(db):
+    """Categories that currently have products, in name order; backfills the table on first use"""
+    if db.query(CategoryModel.id).first() is None:
+        sync_categories(db)
+    return (
+        db.query(CategoryModel)
+        .filter(CategoryModel.product_count > 0)
+        .order_by(CategoryModel.name)
+        .all()
+    )
@@ -0,0 +1,226 @@
+"""Response compression (gzip, and Brotli when the `brotli` package is installed).
+
+`CompressionMiddleware` is plain ASGI. The encoding is negotiated from
+Accept-Encoding (q-values respected; Brotli preferred on a tie) and a
+response is compressed only when:
+
+- its Content-Type starts with an entry of COMPRESSION_CONTENT_TYPES
+- it is not already encoded, and has no ``Cache-Control: no-transform``
+- a single-message body is at least COMPRESSION_MIN_SIZE bytes
+
+Single-message bodies (every JSON endpoint) are compressed in one call, in
+a worker thread when they are large, and get an exact Content-Length.
+Streaming bodies are compressed chunk by chunk with a sync flush after
+each chunk, so the client receives every chunk as soon as it is sent.
+Strong ETags become weak (the bytes differ per encoding);
+`cache.etag_matches` already compares weakly.
+
+Per route, app.metrics gets the bytes before and after compression and
+the CPU time spent compressing.
+"""
+from typing import Optional, Tuple
+import time
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.metrics import metrics, route_template
+
+try:
+    import brotli
+except ImportError:  # optional - gzip only
+    brotli = None
+
+# Single bodies at least this large are compressed off the event loop
+THREAD_MIN_SIZE = 256 * 1024
+
+compression_bytes_in = metrics.counter(
+    "http_response_compression_bytes_in_total", "Response bytes before compression", ("route", "encoding")
+)
+compression_bytes_out = metrics.counter(
+    "http_response_compression_bytes_out_total", "Response bytes after compression", ("route", "encoding")
+)
+compression_seconds = metrics.counter(
+    "http_response_compression_cpu_seconds_total", "CPU time spent compressing responses", ("route", "encoding")
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding value, or None"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            weights[coding] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Encoder:
+    """Streaming compressor for one response"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 16 + 15: gzip container
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        self.cpu_seconds = 0.0
+
+    def chunk(self, data: bytes) -> bytes:
+        start = time.thread_time()
+        if self.encoding == "br":
+            out = self._compressor.process(data) + self._compressor.flush()
+        else:
+            out = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.cpu_seconds += time.thread_time() - start
+        return out
+
+    def finish(self) -> bytes:
+        start = time.thread_time()
+        out = self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+        self.cpu_seconds += time.thread_time() - start
+        return out
+
+    def whole(self, data: bytes) -> Tuple[bytes, float]:
+        """Compress a complete body; returns (bytes, CPU seconds) of the calling thread"""
+        start = time.thread_time()
+        if self.encoding == "br":
+            out = self._compressor.process(data) + self._compressor.finish()
+        else:
+            out = self._compressor.compress(data) + self._compressor.flush()
+        return out, time.thread_time() - start
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        content_types: Tuple[str, ...] = ("application/json", "text/"),
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_type.lower() for content_type in content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(self, scope, encoding, send).run(receive)
+
+    def eligible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(self.content_types)
+
+
+class _CompressedResponse:
+    """Send wrapper for one request: decides on the first body message whether to compress"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope, encoding: str, send):
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def run(self, receive):
+        try:
+            await self.middleware.app(self.scope, receive, self.send_wrapper)
+        finally:
+            if self.encoder is not None:
+                labels = (route_template(self.scope), self.encoding)
+                compression_bytes_in.inc(*labels, amount=self.bytes_in)
+                compression_bytes_out.inc(*labels, amount=self.bytes_out)
+                compression_seconds.inc(*labels, amount=self.encoder.cpu_seconds)
+
+    async def send_wrapper(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            if message["status"] < 200 or message["status"] in (204, 304) or not self.middleware.eligible(headers):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                # Held until the first body message shows the size
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(scope=self.start_message)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+
+            if not more_body:
+                # Whole body in one message: compress once, exact Content-Length
+                if len(body) >= THREAD_MIN_SIZE:
+                    compressed, cpu = await run_in_threadpool(self.encoder.whole, body)
+                else:
+                    compressed, cpu = self.encoder.whole(body)
+                self.encoder.cpu_seconds += cpu
+                self.bytes_in, self.bytes_out = len(body), len(compressed)
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+
+            del headers["Content-Length"]
+            await self.send(self.start_message)
+
+        compressed = self.encoder.chunk(body) if body else b""
+        if not more_body:
+            compressed += self.encoder.finish()
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
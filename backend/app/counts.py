@@ -0,0 +1,85 @@
+"""Total counts for product listings.
+
+`count_mode` trades accuracy for latency on broad filters:
+
+- ``exact``      COUNT(*) over the filtered query (cached per filter
+                 signature and catalog version)
+- ``estimated``  PostgreSQL planner estimate: pg_class.reltuples for the
+                 unfiltered table, EXPLAIN's row estimate for filtered
+                 queries. Falls back to exact elsewhere.
+- ``capped``     counts at most `cap` + 1 rows and reports "cap+" beyond that
+"""
+from typing import Iterable, Optional, Tuple
+import json
+
+from sqlalchemy import func, text
+
+from app.cache import catalog_cache
+from app.models import Product as ProductModel
+
+COUNT_MODES = ("exact", "estimated", "capped")
+
+
+def _exact(query) -> int:
+    return query.order_by(None).count()
+
+
+def _capped(db, query, cap: int) -> int:
+    limited = query.with_entities(ProductModel.id).order_by(None).limit(cap + 1).subquery()
+    return db.query(func.count()).select_from(limited).scalar()
+
+
+def _estimated(db, query, filtered: bool) -> Optional[int]:
+    """Planner row estimate, or None when no usable estimate is available"""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    if not filtered:
+        reltuples = db.execute(text("SELECT reltuples FROM pg_class WHERE relname = 'products'")).scalar()
+        # -1 (or 0) means the table has not been analyzed yet
+        return int(reltuples) if reltuples and reltuples > 0 else None
+    statement = query.order_by(None).statement.compile(dialect=bind.dialect)
+    params = statement.params
+    if statement.positional:
+        # asyncpg takes positional ($1, $2) parameters, psycopg2 named ones
+        params = tuple(params[name] for name in statement.positiontup)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_products(
+    db,
+    query,
+    mode: str = "exact",
+    filtered: bool = True,
+    cap: int = 1000,
+    cache_key: Optional[str] = None,
+    tags: Iterable[str] = (),
+) -> Tuple[int, bool, Optional[str]]:
+    """Count rows of `query` according to `mode`.
+
+    Returns (total, is_exact, label). `label` is set when the total is not
+    exact: "~N" for estimates and "N+" when the cap was hit.
+    """
+    if mode == "estimated":
+        estimate = _estimated(db, query, filtered)
+        if estimate is not None:
+            return estimate, False, f"~{estimate}"
+        mode = "exact"
+
+    if mode == "capped":
+        total = _capped(db, query, cap)
+        if total > cap:
+            return cap, False, f"{cap}+"
+        return total, True, None
+
+    if cache_key is not None:
+        cached = catalog_cache.get(cache_key)
+        if cached is not None:
+            return int(cached), True, None
+    total = _exact(query)
+    if cache_key is not None:
+        catalog_cache.set(cache_key, str(total).encode("utf-8"), tags)
+    return total, True, None
@@ -0,0 +1,193 @@
+"""Facet counts for the product filter sidebar.
+
+`compute_facets` answers for the current search/filter state in a single
+grouped query over (category, price bucket, in price range). Each facet
+ignores its own filter, so the sidebar can still show the other
+categories and price ranges:
+
+- category counts respect search and price filters
+- price bucket counts respect search and category filters
+
+With FACETS_PRECOMPUTED enabled, requests without a search or price
+filter (and with the default buckets) read the `product_facets` table
+instead. The admin product endpoints keep that table up to date with
+`adjust_facets` in the same transaction as the product write. Products
+without a category are stored under the category "", so both paths count
+them in the price ranges and total but list no category for them.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, literal
+
+from app.config import settings
+from app.database import mark_precomputed, precomputed_at, upsert
+from app.models import Product as ProductModel, ProductFacet
+from app.search import apply_search
+
+
+def parse_bucket_edges(value: Optional[str]) -> List[float]:
+    """Parse comma-separated price bucket edges, e.g. "25,50,100" -> [25.0, 50.0, 100.0]"""
+    if not value:
+        return []
+    edges = sorted({float(edge) for edge in value.split(",") if edge.strip()})
+    if any(edge <= 0 for edge in edges):
+        raise ValueError("Price bucket edges must be positive")
+    return edges
+
+
+DEFAULT_BUCKET_EDGES = parse_bucket_edges(settings.facet_price_buckets)
+
+
+def bucket_ranges(edges: List[float]) -> List[Tuple[float, Optional[float]]]:
+    """(min, max) for each bucket; the last bucket is open-ended"""
+    bounds = [0.0] + edges
+    return [(bounds[i], edges[i] if i < len(edges) else None) for i in range(len(bounds))]
+
+
+def bucket_label(low: float, high: Optional[float]) -> str:
+    return f"{low:g}-{high:g}" if high is not None else f"{low:g}+"
+
+
+def _bucket_expression(edges: List[float]):
+    """SQL bucket index for price: same rule as bisect_right(edges, price)"""
+    price = func.coalesce(ProductModel.price, 0.0)
+    if not edges:
+        return literal(0)
+    return case(*[(price < edge, i) for i, edge in enumerate(edges)], else_=len(edges))
+
+
+def bucket_index(price: Optional[float], edges: List[float]) -> int:
+    return bisect_right(edges, price or 0.0)
+
+
+def _aggregate(rows, category: Optional[str], edges: List[float], source: str) -> Dict[str, object]:
+    """Fold (category, bucket, in_price_range, count) rows into the response shape"""
+    category_filter = category.strip() if category else None
+    category_counts: Dict[str, int] = defaultdict(int)
+    bucket_counts: Dict[int, int] = defaultdict(int)
+    total = 0
+    for category_name, bucket, in_price, count in rows:
+        matches_category = category_filter is None or category_filter == category_name
+        if in_price and category_name:
+            category_counts[category_name] += count
+        if matches_category:
+            bucket_counts[bucket] += count
+        if in_price and matches_category:
+            total += count
+
+    return {
+        "categories": [
+            {"name": name, "count": count}
+            for name, count in sorted(category_counts.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "price_ranges": [
+            {"label": bucket_label(low, high), "min": low, "max": high, "count": bucket_counts.get(i, 0)}
+            for i, (low, high) in enumerate(bucket_ranges(edges))
+        ],
+        "total": total,
+        "source": source,
+    }
+
+
+def compute_facets(
+    db,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    edges: Optional[List[float]] = None,
+) -> Dict[str, object]:
+    edges = DEFAULT_BUCKET_EDGES if edges is None else edges
+
+    if settings.facets_precomputed and not search and min_price is None and max_price is None and edges == DEFAULT_BUCKET_EDGES:
+        rows = _precomputed_rows(db)
+        return _aggregate(rows, category, edges, "precomputed")
+
+    bucket = _bucket_expression(edges)
+    price_conditions = []
+    if min_price is not None:
+        price_conditions.append(ProductModel.price >= min_price)
+    if max_price is not None:
+        price_conditions.append(ProductModel.price <= max_price)
+    in_price = case((and_(*price_conditions), 1), else_=0) if price_conditions else None
+
+    group_columns = [ProductModel.category, bucket] + ([in_price] if in_price is not None else [])
+    query = db.query(*group_columns, func.count(ProductModel.id))
+    if search:
+        query, _ = apply_search(query, search, db, ProductModel)
+    query = query.group_by(*group_columns)
+
+    rows = []
+    for row in query.all():
+        if in_price is None:
+            category_name, bucket_value, count = row
+            rows.append((category_name, bucket_value, 1, count))
+        else:
+            rows.append(tuple(row))
+    return _aggregate(rows, category, edges, "live")
+
+
+# Precomputed table
+
+def _facets_built(db) -> bool:
+    """Whether product_facets has been built, even if the catalog was empty.
+
+    Only `refresh_facets` records the build, so a table left by a version
+    that skipped uncategorized products is rebuilt once.
+    """
+    return precomputed_at(db, ProductFacet.__tablename__) is not None
+
+
+def _precomputed_rows(db):
+    if not _facets_built(db):
+        refresh_facets(db)
+    rows = db.query(ProductFacet.category, ProductFacet.price_bucket, ProductFacet.product_count).all()
+    return [(category_name, bucket, 1, count) for category_name, bucket, count in rows if count]
+
+
+def refresh_facets(db):
+    """Rebuild product_facets from the products table with the default buckets"""
+    bucket = _bucket_expression(DEFAULT_BUCKET_EDGES)
+    category = func.coalesce(ProductModel.category, "")
+    counts = db.query(category, bucket, func.count(ProductModel.id)).group_by(category, bucket).all()
+    db.query(ProductFacet).delete()
+    for category_name, bucket_value, count in counts:
+        db.add(ProductFacet(category=category_name, price_bucket=bucket_value, product_count=count))
+    mark_precomputed(db, ProductFacet.__tablename__, datetime.utcnow())
+    db.commit()
+
+
+def refresh_facets_if_enabled(db):
+    """Rebuild after bulk product inserts (sample data seeding)"""
+    if settings.facets_precomputed:
+        refresh_facets(db)
+
+
+def adjust_facets(db, old: Optional[Tuple[Optional[str], Optional[float]]], new: Optional[Tuple[Optional[str], Optional[float]]]):
+    """Move one product between facet cells; call before committing the product write.
+
+    `old` and `new` are (category, price) before and after the write (None
+    for create/delete). Does nothing until the table has been built, since
+    the first facets request builds it from scratch.
+    """
+    if not settings.facets_precomputed or not _facets_built(db):
+        return
+    for cell, delta in ((old, -1), (new, 1)):
+        if cell is None:
+            continue
+        category_name, price = cell[0] or "", cell[1]
+        bucket_value = bucket_index(price, DEFAULT_BUCKET_EDGES)
+        if delta < 0:
+            db.query(ProductFacet).filter(
+                ProductFacet.category == category_name, ProductFacet.price_bucket == bucket_value
+            ).update({ProductFacet.product_count: ProductFacet.product_count + delta}, synchronize_session=False)
+            continue
+        upsert(
+            db, ProductFacet,
+            {"category": category_name, "price_bucket": bucket_value, "product_count": delta},
+            ["category", "price_bucket"],
+            {"product_count": ProductFacet.product_count + delta, "updated_at": datetime.utcnow()},
+        )
@@ -0,0 +1,130 @@
+"""Precomputed featured-products ranking.
+
+A product's score combines its rating, whether it is in stock, and its
+units sold over the last FEATURED_SALES_WINDOW_DAYS (from order_items):
+
+    score = RATING_WEIGHT * rating / 5 + SALES_WEIGHT * units / max_units
+
+Out-of-stock products are left out. The top FEATURED_SIZE products are
+written to `featured_products` by a background refresh every
+FEATURED_REFRESH_SECONDS, and /products/featured reads that table by
+position, so no sort happens at request time. Each refresh is recorded in
+`precomputed_state`, so a ranking that is legitimately empty (nothing in
+stock) is not rebuilt on every request.
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import logging
+import threading
+
+from sqlalchemy import func, text
+
+from app.config import settings
+from app.database import mark_precomputed, precomputed_at
+from app.models import FeaturedProduct, Order as OrderModel, OrderItem as OrderItemModel, Product as ProductModel
+
+logger = logging.getLogger(__name__)
+
+RATING_WEIGHT = 0.6
+SALES_WEIGHT = 0.4
+
+# Arbitrary constant for pg_try_advisory_xact_lock so only one instance refreshes at a time
+REFRESH_LOCK_ID = 810_042
+
+
+def compute_ranking(db, size: int) -> List[Tuple[str, float]]:
+    """Top `size` (product id, score) pairs, best first"""
+    since = datetime.utcnow() - timedelta(days=settings.featured_sales_window_days)
+    sales = dict(
+        db.query(OrderItemModel.product_id, func.sum(OrderItemModel.quantity))
+        .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+        .filter(OrderModel.created_at >= since)
+        .group_by(OrderItemModel.product_id)
+        .all()
+    )
+    max_units = max(sales.values(), default=0) or 1
+
+    scored = []
+    for product_id, rating, stock in db.query(ProductModel.id, ProductModel.rating, ProductModel.stock).filter(ProductModel.stock > 0):
+        score = RATING_WEIGHT * (rating or 0.0) / 5 + SALES_WEIGHT * (sales.get(product_id) or 0) / max_units
+        scored.append((product_id, round(score, 6)))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:size]
+
+
+def refresh_featured(db) -> int:
+    """Rewrite the featured_products table; returns the number of ranked products.
+
+    On PostgreSQL a transaction-level advisory lock makes concurrent
+    refreshes from several instances skip rather than collide.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": REFRESH_LOCK_ID}).scalar():
+            db.rollback()
+            return 0
+
+    ranking = compute_ranking(db, settings.featured_size)
+    now = datetime.utcnow()
+    db.query(FeaturedProduct).delete()
+    for position, (product_id, score) in enumerate(ranking, start=1):
+        db.add(FeaturedProduct(position=position, product_id=product_id, score=score, computed_at=now))
+    mark_precomputed(db, FeaturedProduct.__tablename__, now)
+    db.commit()
+
+    from app.cache import bump_catalog_version
+    bump_catalog_version()
+    return len(ranking)
+
+
+def ranking_computed(db) -> bool:
+    """Whether the ranking has been built, even if it came out empty"""
+    if db.query(FeaturedProduct.position).first() is not None:
+        return True
+    return precomputed_at(db, FeaturedProduct.__tablename__) is not None
+
+
+def featured_products(db, limit: int, columns=None):
+    """Ranked products straight from the precomputed table; builds it on first use.
+
+    Pass `columns` to select only those product columns (rows instead of models).
+    """
+    if not ranking_computed(db):
+        refresh_featured(db)
+    return (
+        db.query(*(columns or [ProductModel]))
+        .join(FeaturedProduct, FeaturedProduct.product_id == ProductModel.id)
+        .order_by(FeaturedProduct.position)
+        .limit(limit)
+        .all()
+    )
+
+
+class FeaturedRefresher:
+    """Background thread that refreshes the ranking on a fixed interval"""
+
+    def __init__(self, session_factory, interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0 or self.session_factory is None:
+            return
+        self._thread = threading.Thread(target=self._run, name="featured-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = self.session_factory()
+            try:
+                ranked = refresh_featured(db)
+                logger.info(f"Featured ranking refreshed ({ranked} products)")
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Featured ranking refresh failed: {e}")
+            finally:
+                db.close()
@@ -0,0 +1,68 @@
+"""Sparse fieldsets (`?fields=`) for product listings.
+
+`fields=id,name,price,image_url,rating` selects only those columns in SQL
+(plus `id`, and whatever a listing needs internally such as the cursor's
+sort column) and returns only the requested keys, so grid views skip the
+description column entirely.
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.models import Product as ProductModel
+
+# Response field -> column, for the public catalog endpoints
+PRODUCT_COLUMNS = {
+    "id": ProductModel.id,
+    "name": ProductModel.name,
+    "description": ProductModel.description,
+    "price": ProductModel.price,
+    "category": ProductModel.category,
+    "image_url": ProductModel.image_url,
+    "stock": ProductModel.stock,
+    "rating": ProductModel.rating,
+}
+
+# Response fields with a fixed value and no column
+PRODUCT_CONSTANTS = {"currency": "USD", "review_count": 0}
+
+# The admin product list also exposes timestamps
+ADMIN_PRODUCT_COLUMNS = {
+    **PRODUCT_COLUMNS,
+    "created_at": ProductModel.created_at,
+    "updated_at": ProductModel.updated_at,
+}
+
+
+def parse_fields(value: Optional[str], columns: Dict[str, object], constants: Dict[str, object] = PRODUCT_CONSTANTS) -> Optional[List[str]]:
+    """Requested field names in order, or None for the full representation.
+
+    Raises ValueError for unknown names.
+    """
+    if not value or not value.strip():
+        return None
+    names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in columns and name not in constants]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(list(columns) + list(constants))}")
+    return names
+
+
+def projected_columns(fields: List[str], columns: Dict[str, object], extra: Iterable[str] = ()) -> List[object]:
+    """Columns to select for `fields`: always id, then the requested columns and `extra`"""
+    names = dict.fromkeys(["id", *fields, *extra])
+    return [columns[name] for name in names if name in columns]
+
+
+def sparse_product(row, fields: List[str], resolve_image: Callable[[Optional[str]], Optional[str]], constants: Dict[str, object] = PRODUCT_CONSTANTS) -> dict:
+    """Only the requested fields of a projected row, in request order"""
+    product = {}
+    for name in fields:
+        if name in constants:
+            product[name] = constants[name]
+            continue
+        value = getattr(row, name)
+        if name == "image_url":
+            value = resolve_image(value)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        product[name] = value
+    return product
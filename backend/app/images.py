@@ -0,0 +1,85 @@
+"""Product image URL handling.
+
+Image URLs are stored in a canonical, host-independent form when products
+are written (`canonicalize_image_url`) and turned into a final URL for the
+current request base by `resolve_image_url`, which is memoized per
+(stored value, base URL). Legacy rows that were stored before
+canonicalization go through the same path, so resolution is a dict lookup
+after the first request.
+"""
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlparse
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "")
+
+GCS_URL_PREFIXES = ("https://storage.googleapis.com", "https://storage.cloud.google.com")
+
+LOCALHOST_PREFIXES = (
+    'http://localhost', 'http://127.0.0.1', 'http://0.0.0.0',
+    'https://localhost', 'https://127.0.0.1', 'https://0.0.0.0',
+)
+
+
+def canonicalize_image_url(raw_url: Optional[str]) -> Optional[str]:
+    """Reduce an image URL to the form stored in the database.
+
+    - GCS URLs are kept as-is
+    - Anything containing /uploads/ becomes the relative '/uploads/...' path
+    - Localhost/0.0.0.0/127.0.0.1 URLs become their relative path (+ query)
+    - Other http URLs are upgraded to https
+    """
+    if not raw_url:
+        return raw_url
+
+    url = raw_url.strip()
+
+    if url.startswith(GCS_URL_PREFIXES):
+        return url
+
+    # e.g. "https://backend.../uploads/file.jpg" -> "/uploads/file.jpg"
+    if '/uploads/' in url:
+        return url[url.find('/uploads/'):]
+
+    if url.startswith(LOCALHOST_PREFIXES):
+        parsed = urlparse(url)
+        path_and_query = parsed.path or '/'
+        if parsed.query:
+            path_and_query += f"?{parsed.query}"
+        return path_and_query
+
+    if url.startswith('http://'):
+        return 'https://' + url[len('http://'):]
+
+    return url
+
+
+@lru_cache(maxsize=4096)
+def resolve_image_url(stored_url: Optional[str], base_url: str) -> Optional[str]:
+    """Final image URL for a stored value, relative to the request `base_url` (no trailing slash).
+
+    Uploads resolve to the public GCS object when GCS_BUCKET_NAME is set,
+    otherwise to this backend's /uploads route.
+    """
+    url = canonicalize_image_url(stored_url)
+    if not url:
+        return url
+
+    if url.startswith('/uploads'):
+        filename = url[len('/uploads'):].lstrip('/')
+        if GCS_BUCKET_NAME and filename:
+            # Bucket is public, so the URL can be built without any API calls
+            resolved = f"https://storage.googleapis.com/{GCS_BUCKET_NAME}/uploads/{filename}"
+        else:
+            resolved = f"{base_url}{url}"
+        logger.debug("Resolved image %s -> %s", stored_url, resolved)
+        return resolved
+
+    if url.startswith('/'):
+        return f"{base_url}{url}"
+
+    return url
@@ -0,0 +1,46 @@
+"""Deferred imports for heavy dependencies.
+
+Importing PyJWT (which pulls in `cryptography` when installed) and passlib
+costs tens of milliseconds each, paid on every cold start even though
+only the first authenticated request needs them. `lazy_import` returns a
+stand-in module that imports the real one on first attribute access;
+`Lazy` does the same for any object built by a factory (e.g. the bcrypt
+CryptContext).
+
+    jwt = lazy_import("jwt")
+    jwt.decode(...)  # imports jwt here
+
+google.cloud.storage is already imported inside the upload functions.
+"""
+from typing import Any, Callable
+import importlib
+import threading
+
+
+class Lazy:
+    """Stand-in that builds the real object with `factory` on first attribute access"""
+
+    def __init__(self, factory: Callable[[], Any], name: str):
+        self._factory = factory
+        self._name = name
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<lazy {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> Lazy:
+    """Module `name`, imported when first used"""
+    return Lazy(lambda: importlib.import_module(name), name)
@@ -0,0 +1,129 @@
+"""Application logging: leveled, structured and off the request path.
+
+`setup_logging()` (called once from app.main) installs a single
+QueueHandler on the root logger. Request threads and the event loop only
+enqueue records; a QueueListener thread formats them and writes to stdout.
+
+- LOG_LEVEL      root level (DEBUG, INFO, WARNING, ...)
+- LOG_FORMAT     "json" (one object per line, with Cloud Logging's
+                 `severity` field) or "text" for local development
+- LOG_DEBUG_SAMPLE_RATE
+                 fraction of DEBUG records kept (0-1), so high-volume
+                 debug lines can stay enabled in production. A record can
+                 override it with ``extra={"sample_rate": ...}``.
+
+Modules log through ``logger = logging.getLogger(__name__)``. Extra fields
+passed with ``extra={...}`` become JSON keys.
+"""
+from typing import Optional
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+from app.config import settings
+
+# Attributes every LogRecord has; anything else came from `extra=`
+# (uvicorn adds an ANSI-coloured copy of its messages as color_message)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample_rate", "color_message"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Keep a random `rate` fraction of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = getattr(record, "sample_rate", self.rate)
+        return rate >= 1 or random.random() < rate
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record as-is (the listener formats it); just render the
+        # message now so arguments are not mutated before the writer runs
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """Route all logging through a background writer thread; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or settings.log_level).upper()
+    fmt = (fmt or settings.log_format).lower()
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    enqueue = _EnqueueHandler(records)
+    enqueue.addFilter(DebugSampler(settings.log_debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(enqueue)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def pause_logging():
+    """Flush queued records and stop the writer thread, keeping the handlers.
+
+    Call before os.fork: the child then starts from an empty queue and no
+    half-written record, and calls `resume_logging()` to get its own
+    writer thread (threads do not survive fork). Records logged while
+    paused wait in the queue.
+    """
+    if _listener is not None:
+        _listener.stop()
+
+
+def resume_logging():
+    """Start the writer thread stopped by `pause_logging()`"""
+    if _listener is not None:
+        _listener.start()
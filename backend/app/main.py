@@ -1,18 +1,29 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-import uvicorn
+from app.serialization import FastJSONResponse
+import importlib
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+# Structured, queued logging first, so import-time messages go through it
+try:
+    from app.logging_config import setup_logging
+    setup_logging()
+except Exception as e:
+    logging.basicConfig(level=logging.INFO)
+    logger.warning(f"Could not set up structured logging: {e}")
+
 # CRITICAL: Import settings with error handling - don't block if it fails
 try:
     from app.config import settings
 except Exception as e:
-    print(f"⚠️ Warning: Could not import settings: {e}", flush=True)
+    logger.warning(f"Could not import settings: {e}")
     # Create minimal settings
     class MinimalSettings:
         allowed_origins = ["*"]
@@ -25,49 +36,22 @@ except Exception as e:
 try:
     from app.database import init_db
 except Exception as e:
-    print(f"⚠️ Warning: Could not import database: {e}", flush=True)
+    logger.warning(f"Could not import database: {e}")
     init_db = None
 
-# Import routers individually with error handling - so one failure doesn't break all
-# CRITICAL: Ensure dependencies are available first
+# Import routers individually with error handling - so one failure doesn't break all.
+# Their dependencies (database, config, models) come in with them; a failure is logged per router.
 routers = {}
 router_names = ['auth', 'products', 'cart', 'orders', 'admin', 'upload', 'favorites']
 
-# Ensure critical dependencies exist before importing routers
-try:
-    from app.database import get_db
-    print("✅ Database dependency available", flush=True)
-except Exception as e:
-    print(f"⚠️ Warning: Database dependency not available: {e}", flush=True)
-
-try:
-    from app.config import JWT_CONFIG
-    print("✅ JWT config available", flush=True)
-except Exception as e:
-    print(f"⚠️ Warning: JWT config not available: {e}", flush=True)
-
-try:
-    from app.models import User, Product, Order
-    print("✅ Models available", flush=True)
-except Exception as e:
-    print(f"⚠️ Warning: Models not available: {e}", flush=True)
-
-# Now import routers
 for router_name in router_names:
     try:
-        print(f"🔍 Attempting to import router '{router_name}'...", flush=True)
-        router_module = __import__(f'app.routers.{router_name}', fromlist=[router_name])
-        router_obj = getattr(router_module, 'router', None)
-        if router_obj:
-            routers[router_name] = router_obj
-            print(f"✅ Router '{router_name}' imported and registered successfully", flush=True)
-        else:
-            print(f"⚠️ Warning: Router '{router_name}' module found but no 'router' attribute", flush=True)
-            routers[router_name] = None
+        router_module = importlib.import_module(f"app.routers.{router_name}")
+        routers[router_name] = getattr(router_module, "router", None)
+        if routers[router_name] is None:
+            logger.warning(f"Router '{router_name}' module found but no 'router' attribute")
     except Exception as e:
-        print(f"❌ ERROR: Router '{router_name}' failed to import: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Router '{router_name}' failed to import: {e}")
         routers[router_name] = None
 
 # Application lifespan - CRITICAL: Must be fast and never block
@@ -75,44 +59,68 @@ for router_name in router_names:
 async def lifespan(app: FastAPI):
     # Startup - mark ready IMMEDIATELY
     import sys
-    print("🚀 Starting E-commerce Store Backend...", flush=True)
-    print(f"📦 Python version: {sys.version}", flush=True)
-    print(f"🌐 PORT environment variable: {os.getenv('PORT', 'not set')}", flush=True)
+    logger.info("Starting E-commerce Store Backend...")
+    logger.info(f"Python version: {sys.version}")
+    logger.info(f"PORT environment variable: {os.getenv('PORT', 'not set')}")
     
-    # CRITICAL: Yield immediately - server MUST be ready NOW
-    print("✅ Application startup complete - server is ready!", flush=True)
-    yield
+    # Featured-products ranking refresh runs in a background thread
+    featured_refresher = None
+    try:
+        from app.database import SessionLocal
+        from app.featured import FeaturedRefresher
+        featured_refresher = FeaturedRefresher(SessionLocal, getattr(settings, "featured_refresh_seconds", 900))
+        featured_refresher.start()
+    except Exception as e:
+        logger.warning(f"Could not start featured ranking refresh: {e}")
     
-    # Initialize database in background AFTER server is ready
-    if init_db:
+    # Search suggestion index resync also runs in a background thread
+    suggestion_refresher = None
+    try:
+        from app.database import SessionLocal
+        from app.suggestions import SuggestionRefresher, suggestion_index
+        suggestion_refresher = SuggestionRefresher(
+            suggestion_index, SessionLocal,
+            getattr(settings, "suggestion_refresh_seconds", 300), getattr(settings, "suggestion_check_seconds", 5),
+        )
+        suggestion_refresher.start()
+    except Exception as e:
+        logger.warning(f"Could not start suggestion index refresh: {e}")
+    
+    # Warm-up (tables, pools, crypto, caches) runs in the background; /ready reports when it is done
+    warmup_task = None
+    if getattr(settings, "warmup_enabled", False):
+        try:
+            import asyncio
+            from app.warmup import run_warmup
+            warmup_task = asyncio.create_task(run_warmup(app))
+        except Exception as e:
+            logger.warning(f"Could not start warm-up: {e}")
+    elif init_db:
+        # Initialize database in background so the server is ready NOW
         def init_db_background():
             try:
-                print("📊 Initializing database in background...", flush=True)
+                logger.info("Initializing database in background...")
                 init_db()
             except Exception as e:
-                print(f"⚠️ Warning: Database initialization failed: {e}", flush=True)
+                logger.warning(f"Database initialization failed: {e}")
         
         import threading
         db_thread = threading.Thread(target=init_db_background, daemon=True)
         db_thread.start()
     
+    # CRITICAL: Yield immediately - server MUST be ready NOW
+    logger.info("Application startup complete - server is ready!")
+    yield
+    
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if featured_refresher:
+        featured_refresher.stop()
+    if suggestion_refresher:
+        suggestion_refresher.stop()
+    
     # Shutdown
-    print("🛑 Shutting down E-commerce Store Backend...", flush=True)
-
-# Middleware to ensure HTTPS redirects use HTTPS (for Cloud Run)
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Check if request is behind a proxy (Cloud Run sets X-Forwarded-Proto)
-        if request.headers.get("X-Forwarded-Proto") == "https":
-            # Force the request URL to use HTTPS
-            request.scope["scheme"] = "https"
-        elif request.url.scheme == "http" and "X-Forwarded-Proto" in request.headers:
-            # If behind proxy and X-Forwarded-Proto is set, use it
-            proto = request.headers.get("X-Forwarded-Proto", "https")
-            request.scope["scheme"] = proto
-        
-        response = await call_next(request)
-        return response
+    logger.info("Shutting down E-commerce Store Backend...")
 
 # Create FastAPI app
 app = FastAPI(
@@ -121,16 +129,21 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
-# Add HTTPS redirect middleware FIRST (before CORS)
-app.add_middleware(HTTPSRedirectMiddleware)
+# Trust X-Forwarded-Proto/For from the load balancer so redirects and URLs use https (Cloud Run)
+try:
+    from app.proxy_headers import ProxyHeadersMiddleware
+    app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=getattr(settings, "forwarded_allow_ips", "*"))
+except Exception as e:
+    logger.warning(f"Could not set up proxy headers middleware: {e}")
 
 # Add CORS middleware - TEMPORARILY ALLOW ALL ORIGINS to fix CORS blocking
 # This will be restricted later once we confirm everything works
-print("🌐 Configuring CORS middleware - ALLOWING ALL ORIGINS (temporary)", flush=True)
-print(f"🌐 CORS_ORIGINS env var: {os.getenv('CORS_ORIGINS', 'not set')}", flush=True)
+logger.info("Configuring CORS middleware - ALLOWING ALL ORIGINS (temporary)")
+logger.info(f"CORS_ORIGINS env var: {os.getenv('CORS_ORIGINS', 'not set')}")
 
 try:
     # FORCE ALLOW ALL ORIGINS - this fixes the CORS blocking issue immediately
@@ -142,11 +155,9 @@ try:
         allow_headers=["*"],  # Allow all headers
         expose_headers=["*"],  # Expose all headers
     )
-    print("✅ CORS middleware configured - ALLOWING ALL ORIGINS", flush=True)
+    logger.info("CORS middleware configured - ALLOWING ALL ORIGINS")
 except Exception as e:
-    print(f"❌ CRITICAL: CORS middleware setup failed: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
+    logger.exception(f"CORS middleware setup failed: {e}")
     # Even if setup fails, try to add it anyway
     try:
         app.add_middleware(
@@ -156,9 +167,9 @@ except Exception as e:
             allow_methods=["*"],
             allow_headers=["*"],
         )
-        print("✅ CORS middleware added via fallback", flush=True)
+        logger.info("CORS middleware added via fallback")
     except Exception as e2:
-        print(f"❌ CRITICAL: Even fallback CORS setup failed: {e2}", flush=True)
+        logger.critical(f"Even fallback CORS setup failed: {e2}")
 
 # Add trusted host middleware
 app.add_middleware(
@@ -166,6 +177,39 @@ app.add_middleware(
     allowed_hosts=["*"]  # Configure appropriately for production
 )
 
+# Per-request statement counts as response headers (debugging N+1 queries)
+if getattr(settings, "query_debug", False):
+    try:
+        from app.querycount import QueryDebugMiddleware
+        app.add_middleware(QueryDebugMiddleware, repeat_warn=settings.query_repeat_warn)
+        logger.info("Query debug headers enabled")
+    except Exception as e:
+        logger.warning(f"Could not set up query debug middleware: {e}")
+
+# gzip/Brotli response compression, inside the metrics middleware so its cost is timed
+if getattr(settings, "compression_enabled", False):
+    try:
+        from app.compression import CompressionMiddleware
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_min_size,
+            content_types=tuple(t.strip() for t in settings.compression_content_types.split(",") if t.strip()),
+            gzip_level=settings.gzip_level,
+            brotli_quality=settings.brotli_quality,
+        )
+        logger.info("Response compression configured")
+    except Exception as e:
+        logger.warning(f"Could not set up response compression: {e}")
+
+# Request metrics - added last so it is the outermost middleware and times everything
+if getattr(settings, "metrics_enabled", False):
+    try:
+        from app.metrics import MetricsMiddleware
+        app.add_middleware(MetricsMiddleware)
+        logger.info("Metrics middleware configured")
+    except Exception as e:
+        logger.warning(f"Could not set up metrics middleware: {e}")
+
 # Include routers individually - register each one separately so failures don't break others
 router_configs = [
     ("auth", "/api/v1/auth", "Authentication"),
@@ -182,16 +226,14 @@ for router_name, prefix, tag in router_configs:
     if routers.get(router_name):
         try:
             app.include_router(routers[router_name], prefix=prefix, tags=[tag])
-            print(f"✅ Router '{router_name}' registered at {prefix}", flush=True)
+            logger.debug(f"Router '{router_name}' registered at {prefix}")
             registered_count += 1
         except Exception as e:
-            print(f"⚠️ Warning: Failed to register router '{router_name}': {e}", flush=True)
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Failed to register router '{router_name}': {e}")
     else:
-        print(f"⚠️ Warning: Router '{router_name}' not available, skipping", flush=True)
+        logger.warning(f"Router '{router_name}' not available, skipping")
 
-print(f"✅ Registered {registered_count}/{len(router_configs)} routers successfully", flush=True)
+logger.info(f"Registered {registered_count}/{len(router_configs)} routers successfully")
 
 # Route to serve images from GCS for /uploads/{filename} requests
 # This handles cases where products have relative /uploads/ URLs but files are in GCS
@@ -239,7 +281,7 @@ async def serve_upload_from_gcs(filename: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error serving image from GCS: {e}", flush=True)
+        logger.error(f"Error serving image from GCS: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to serve image: {str(e)}")
 
 # Mount static files for uploads (fallback for local development)
@@ -247,7 +289,7 @@ if os.path.exists("uploads"):
     try:
         app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
     except Exception as e:
-        print(f"⚠️ Warning: Could not mount static files: {e}", flush=True)
+        logger.warning(f"Could not mount static files: {e}")
 
 # Health check endpoint
 @app.get("/health")
@@ -258,6 +300,25 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Readiness endpoint - 503 until startup warm-up has finished (or WARMUP_TIMEOUT has passed)
+@app.get("/ready")
+async def readiness_check():
+    if not getattr(settings, "warmup_enabled", False):
+        return {"status": "ready"}
+    from app.warmup import warmup_state
+    report = warmup_state.report()
+    if not warmup_state.ready:
+        return FastJSONResponse(status_code=503, content={"status": "warming_up", "warmup": report})
+    return {"status": "ready", "warmup": report}
+
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not getattr(settings, "metrics_enabled", False):
+        raise HTTPException(status_code=404, detail="Not Found")
+    from app.metrics import CONTENT_TYPE, metrics
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 # Database initialization endpoint
 @app.get("/api/v1/init-db")
 async def initialize_database():
@@ -280,10 +341,8 @@ async def initialize_database():
             "message": "Database tables created and initialized successfully"
         }
     except Exception as e:
-        import traceback
         error_msg = f"Database initialization failed: {str(e)}"
-        print(f"❌ {error_msg}", flush=True)
-        traceback.print_exc()
+        logger.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 # CORS test endpoint
@@ -319,6 +378,7 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "app.main:app",
         host=settings.host,
@@ -0,0 +1,355 @@
+"""Prometheus-style metrics, served as text from /metrics.
+
+`MetricsMiddleware` (pure ASGI, outermost) records for every HTTP request:
+
+- http_requests_total{method,route,status}
+- http_request_duration_seconds{method,route,status} (histogram)
+- http_requests_in_progress{method}
+- http_request_db_queries{route} and http_request_db_seconds{route}:
+  statements and SQL time per request, counted by SQLAlchemy
+  before/after_cursor_execute hooks on every engine
+
+`route` is the route template (/api/v1/products/{product_id}), never the
+raw path, so label cardinality stays bounded; unmatched paths share one
+"<unmatched>" label.
+
+At scrape time the cache hit/miss counters (every `create_cache`) and the
+connection pool telemetry (app.pool_stats, including replicas) are added.
+No dependencies: if `prometheus_client` happens to be installed, its
+default registry (process and GC metrics) is appended to the output.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.pool_stats import Histogram
+
+try:
+    import prometheus_client
+except ImportError:  # optional
+    prometheus_client = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds: request latency in seconds, statements per request
+REQUEST_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+SQL_TIME_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class _Family:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class LabeledHistogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], bounds: List[float]):
+        super().__init__(name, help, labels)
+        self.bounds = bounds
+        self._histograms: Dict[Tuple, Histogram] = {}
+
+    def observe(self, value: float, *label_values):
+        histogram = self._histograms.get(label_values)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(label_values, Histogram(self.bounds))
+        histogram.observe(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            histograms = list(self._histograms.items())
+        lines = self.header()
+        for key, histogram in histograms:
+            lines += histogram_lines(self.name, self.labels, key, histogram.snapshot())
+        return lines
+
+
+def histogram_lines(name: str, label_names: Tuple[str, ...], label_values: Tuple, snapshot: Dict[str, object]) -> List[str]:
+    """Exposition lines for one `pool_stats.Histogram.snapshot()`"""
+    lines = []
+    for bound, count in snapshot["buckets"].items():
+        le = f'le="{bound}"'
+        lines.append(f"{name}_bucket{_labels(label_names, label_values, le)} {count}")
+    lines.append(f"{name}_sum{_labels(label_names, label_values)} {_number(snapshot['sum_seconds'])}")
+    lines.append(f"{name}_count{_labels(label_names, label_values)} {snapshot['count']}")
+    return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families: List[_Family] = []
+        # Callables returning extra exposition lines, run on every scrape
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        family = Counter(name, help, labels)
+        self.families.append(family)
+        return family
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        family = Gauge(name, help, labels)
+        self.families.append(family)
+        return family
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...], bounds: List[float]) -> LabeledHistogram:
+        family = LabeledHistogram(name, help, labels, bounds)
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families:
+            lines += family.render()
+        for collector in self.collectors:
+            try:
+                lines += collector()
+            except Exception as e:
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {_escape(e)}")
+        text = "\n".join(lines) + "\n"
+        if prometheus_client is not None:
+            text += prometheus_client.generate_latest(prometheus_client.REGISTRY).decode("utf-8")
+        return text
+
+
+metrics = MetricsRegistry()
+
+requests_total = metrics.counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"), REQUEST_BUCKETS
+)
+requests_in_progress = metrics.gauge("http_requests_in_progress", "HTTP requests being handled", ("method",))
+request_db_queries = metrics.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("route",), QUERY_COUNT_BUCKETS
+)
+request_db_seconds = metrics.histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ("route",), SQL_TIME_BUCKETS
+)
+db_queries_total = metrics.counter("db_queries_total", "SQL statements executed, in and outside requests")
+db_query_seconds_total = metrics.counter("db_query_seconds_total", "Time spent in SQL, in and outside requests")
+
+
+class RequestStats:
+    """Database work done while handling one request"""
+
+    __slots__ = ("queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request"""
+    return _request_stats.get()
+
+
+# Called with (statement, seconds) after every statement, from the one pair
+# of cursor hooks below (app.querycount records its query logs this way)
+statement_observers: List[Callable[[str, float], None]] = []
+
+
+# Class-level listeners cover every engine: primary, async (its sync_engine)
+# and replicas. The context variable follows the request into threadpool
+# sessions and AsyncSession.run_sync greenlets.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started_at", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    db_queries_total.inc()
+    db_query_seconds_total.inc(amount=elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+    for observer in statement_observers:
+        observer(statement, elapsed)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    # Routes of an included router can report their path without the router
+    # prefix ("/{product_id}"); put back whatever part of the URL preceded it
+    path = scope.get("path", "")
+    try:
+        concrete = route.path_format.format(**{key: str(value) for key, value in scope.get("path_params", {}).items()})
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return template
+    if concrete != path and path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + template
+    return template
+
+
+# Set while the app sends requests to itself (app.warmup); those are not traffic
+_untracked: ContextVar[bool] = ContextVar("metrics_untracked", default=False)
+
+
+@contextmanager
+def untracked():
+    """Leave requests handled in this context out of the HTTP request metrics"""
+    token = _untracked.set(True)
+    try:
+        yield
+    finally:
+        _untracked.reset(token)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, latency and DB work per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _untracked.get():
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_progress.dec(method)
+            _request_stats.reset(token)
+            route = route_template(scope)
+            requests_total.inc(method, route, str(status))
+            request_duration.observe(elapsed, method, route, str(status))
+            request_db_queries.observe(stats.queries, route)
+            request_db_seconds.observe(stats.sql_seconds, route)
+
+
+def _cache_lines() -> List[str]:
+    from app.cache import caches
+
+    names = ("cache",)
+    hits = ["# HELP cache_hits_total Cache lookups that returned an entry", "# TYPE cache_hits_total counter"]
+    misses = ["# HELP cache_misses_total Cache lookups that found nothing", "# TYPE cache_misses_total counter"]
+    entries = ["# HELP cache_entries Entries held by in-process caches", "# TYPE cache_entries gauge"]
+    for cache in caches:
+        stats = cache.stats()
+        key = (cache.namespace,)
+        hits.append(f"cache_hits_total{_labels(names, key)} {stats['hits']}")
+        misses.append(f"cache_misses_total{_labels(names, key)} {stats['misses']}")
+        if "size" in stats:
+            entries.append(f"cache_entries{_labels(names, key)} {stats['size']}")
+    return hits + misses + entries
+
+
+def _pool_lines() -> List[str]:
+    from app.pool_stats import async_pool_stats, sync_pool_stats
+
+    telemetry = [sync_pool_stats, async_pool_stats]
+    try:
+        from app.replicas import replica_set
+        telemetry += [replica.telemetry for replica in replica_set.replicas]
+    except Exception:
+        pass
+
+    names = ("pool",)
+    snapshots = [(pool.name, pool.snapshot()) for pool in telemetry]
+    snapshots = [(name, snapshot) for name, snapshot in snapshots if snapshot is not None]
+    lines: List[str] = []
+    for metric, kind, help, field in [
+        ("db_pool_checked_out", "gauge", "Connections checked out of the pool", "checkedout"),
+        ("db_pool_checked_in", "gauge", "Idle connections in the pool", "checkedin"),
+        ("db_pool_overflow", "gauge", "Connections open beyond the pool size", "overflow"),
+        ("db_pool_checkouts_total", "counter", "Connection checkouts", "checkouts"),
+        ("db_pool_connects_total", "counter", "New DBAPI connections opened", "connects"),
+        ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection", "timeouts"),
+    ]:
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(names, (name,))} {snapshot[field]}" for name, snapshot in snapshots if field in snapshot]
+    for metric, help, field in [
+        ("db_pool_checkout_seconds", "Time to obtain a pooled connection", "checkout_latency"),
+        ("db_pool_hold_seconds", "Time a connection stays checked out", "hold_time"),
+    ]:
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} histogram"]
+        for name, snapshot in snapshots:
+            lines += histogram_lines(metric, names, (name,), snapshot[field])
+    return lines
+
+
+metrics.collectors += [_cache_lines, _pool_lines]
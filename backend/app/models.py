@@ -96,3 +96,46 @@ class Favorite(Base):
     __table_args__ = (
         UniqueConstraint('user_id', 'product_id', name='uq_user_product_favorite'),
     )
+
+class Category(Base):
+    """Product categories with stable ids; product_count is maintained by the admin product endpoints"""
+    __tablename__ = "categories"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    description = Column(Text)
+    image_url = Column(String)
+    product_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ProductFacet(Base):
+    """Precomputed product counts per (category, price bucket) for the facets endpoint"""
+    __tablename__ = "product_facets"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    category = Column(String, nullable=False)
+    price_bucket = Column(Integer, nullable=False)  # Index into the configured price bucket edges
+    product_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('category', 'price_bucket', name='uq_product_facet_cell'),
+    )
+
+class FeaturedProduct(Base):
+    """Precomputed featured-products ranking, rewritten by the scheduled refresh"""
+    __tablename__ = "featured_products"
+    
+    position = Column(Integer, primary_key=True)  # 1 = top
+    product_id = Column(String, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class PrecomputedState(Base):
+    """When each precomputed table was last rebuilt. A row means the table has
+    been built at least once, even if the build produced no rows."""
+    __tablename__ = "precomputed_state"
+    
+    name = Column(String, primary_key=True)  # Table name, e.g. "featured_products"
+    computed_at = Column(DateTime, default=datetime.utcnow)
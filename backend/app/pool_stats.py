@@ -0,0 +1,128 @@
+"""Connection pool telemetry for sizing the pool against server concurrency.
+
+Each engine gets a `PoolTelemetry`:
+
+- checkout latency: time to obtain a connection from the pool, including
+  waiting for a free slot and opening a new connection (histogram)
+- hold time: how long a request keeps a connection checked out (histogram)
+- timeouts: checkouts that gave up after DB_POOL_TIMEOUT
+
+`pool_class` wraps the pool class passed to create_engine so checkout
+latency can be timed; `attach` adds the checkout/checkin listeners.
+Current pool occupancy (checked out, overflow, idle) comes from the pool
+itself in `snapshot`.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional
+import threading
+import time
+
+from sqlalchemy import event, exc
+
+# Histogram bucket upper bounds in seconds (cumulative, Prometheus style)
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+HOLD_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+
+class Histogram:
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.bounds + [float("inf")], self._counts):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = cumulative
+            return {
+                "count": self.count,
+                "sum_seconds": round(self.sum, 6),
+                "mean_seconds": round(self.sum / self.count, 6) if self.count else 0.0,
+                "max_seconds": round(self.max, 6),
+                "buckets": buckets,
+            }
+
+
+class PoolTelemetry:
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_latency = Histogram(LATENCY_BUCKETS)
+        self.hold_time = Histogram(HOLD_BUCKETS)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.engine = None
+
+    def pool_class(self, base):
+        """Subclass of pool class `base` that times every checkout"""
+        telemetry = self
+
+        class TimedPool(base):
+            def _do_get(self):
+                start = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except exc.TimeoutError:
+                    telemetry.timeouts += 1
+                    raise
+                finally:
+                    telemetry.checkout_latency.observe(time.perf_counter() - start)
+
+        TimedPool.__name__ = f"Timed{base.__name__}"
+        return TimedPool
+
+    def attach(self, engine):
+        """Listen for checkout/checkin on `engine` (pass `.sync_engine` for an AsyncEngine)"""
+        self.engine = engine
+
+        @event.listens_for(engine, "connect")
+        def _connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            connection_record.info["checked_out_at"] = time.perf_counter()
+
+        @event.listens_for(engine, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop("checked_out_at", None)
+            if started is not None:
+                self.hold_time.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Optional[Dict[str, object]]:
+        if self.engine is None:
+            return None
+        pool = self.engine.pool
+        occupancy = {}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if method is not None:
+                occupancy[name] = method()
+        return {
+            "pool": type(pool).__name__,
+            **occupancy,
+            "timeout_seconds": getattr(pool, "_timeout", None),
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "checkout_latency": self.checkout_latency.snapshot(),
+            "hold_time": self.hold_time.snapshot(),
+        }
+
+
+# One per engine in app/database.py
+sync_pool_stats = PoolTelemetry("sync")
+async_pool_stats = PoolTelemetry("async")
@@ -0,0 +1,89 @@
+"""Trust X-Forwarded-* headers from the load balancer (Cloud Run, nginx).
+
+`ProxyHeadersMiddleware` is plain ASGI: it rewrites ``scope["scheme"]``
+from X-Forwarded-Proto and ``scope["client"]`` from X-Forwarded-For in
+place (outer middleware such as app.metrics reads the same scope), then
+calls the app with the original receive/send, so responses (including
+streaming ones) pass through untouched.
+
+Headers are only honoured when the connecting peer is trusted
+(FORWARDED_ALLOW_IPS: comma-separated addresses or CIDR networks, or "*"
+for any peer, which suits Cloud Run where the front end is the only way
+in). The client address is the right-most X-Forwarded-For entry that is
+not itself a trusted proxy.
+"""
+from typing import List, Optional, Union
+import ipaddress
+
+
+class TrustedHosts:
+    def __init__(self, spec: str):
+        entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+        self.always = "*" in entries
+        self.networks: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = []
+        self.literals = set()
+        for entry in entries:
+            if entry == "*":
+                continue
+            try:
+                self.networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                # Not an address (e.g. a unix socket path); compare verbatim
+                self.literals.add(entry)
+
+    def __contains__(self, host: Optional[str]) -> bool:
+        if self.always:
+            return True
+        if not host:
+            return False
+        if host in self.literals:
+            return True
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def client_host(self, forwarded_for: str) -> Optional[str]:
+        """Right-most untrusted address in an X-Forwarded-For chain (left-most when all are trusted)"""
+        hosts = [host.strip() for host in forwarded_for.split(",") if host.strip()]
+        if not hosts:
+            return None
+        if self.always:
+            return hosts[0]
+        for host in reversed(hosts):
+            if host not in self:
+                return host
+        return hosts[0]
+
+
+class ProxyHeadersMiddleware:
+    def __init__(self, app, trusted_hosts: str = "127.0.0.1"):
+        self.app = app
+        self.trusted = TrustedHosts(trusted_hosts)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            client = scope.get("client")
+            if client is None or client[0] in self.trusted:
+                proto = forwarded_for = None
+                for name, value in scope["headers"]:
+                    if name == b"x-forwarded-proto":
+                        proto = value.decode("latin-1")
+                    elif name == b"x-forwarded-for":
+                        forwarded_for = value.decode("latin-1")
+
+                if proto:
+                    # First hop wins if the header was appended to ("https, http")
+                    proto = proto.split(",")[0].strip().lower()
+                    if proto in ("http", "https", "ws", "wss"):
+                        if scope["type"] == "websocket":
+                            proto = proto.replace("http", "ws")
+                        scope["scheme"] = proto
+
+                if forwarded_for:
+                    host = self.trusted.client_host(forwarded_for)
+                    if host:
+                        scope["client"] = (host, 0)
+
+        await self.app(scope, receive, send)
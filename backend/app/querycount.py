@@ -0,0 +1,171 @@
+"""Statement counting for query budgets and N+1 detection.
+
+A `QueryLog` collects every SQL statement executed while it is active,
+grouped by fingerprint (the statement with whitespace collapsed, literals
+and bind parameters replaced by ``?`` and IN lists folded), so a loop that
+issues the same SELECT once per row shows up as one fingerprint with a
+high count.
+
+- Tests: ``count_queries()`` records statements from every thread (the
+  test client runs the app in its own thread), and ``query_budget(n)``
+  fails with the repeated fingerprints when a block runs more than n
+  statements. tests/conftest.py provides it as the ``budget`` fixture::
+
+      def test_admin_orders_budget(client, admin_headers, budget):
+          with budget(5, max_repeats=1):
+              client.get("/api/v1/admin/orders", headers=admin_headers)
+
+- Debug header mode (QUERY_DEBUG=true): `QueryDebugMiddleware` adds
+  X-DB-Queries, X-DB-Time-Ms and X-DB-Repeated to every response and logs
+  a warning when one fingerprint runs QUERY_REPEAT_WARN times or more in a
+  request.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Set, Tuple
+import logging
+import re
+import threading
+
+from app.metrics import statement_observers
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape, independent of parameter values and IN list length"""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Statements executed while active, by fingerprint"""
+
+    def __init__(self):
+        self.count = 0
+        self.sql_seconds = 0.0
+        self.fingerprints: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float):
+        shape = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.sql_seconds += elapsed
+            self.fingerprints[shape] += 1
+
+    def repeated(self, min_count: int = 2) -> List[Tuple[str, int]]:
+        """Fingerprints executed at least `min_count` times, most frequent first"""
+        with self._lock:
+            return [(shape, count) for shape, count in self.fingerprints.most_common() if count >= min_count]
+
+    @property
+    def repeated_count(self) -> int:
+        """Statements beyond the first of each fingerprint"""
+        with self._lock:
+            return sum(count - 1 for count in self.fingerprints.values())
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements, {self.sql_seconds * 1000:.1f} ms in SQL"]
+        lines += [f"  {count}x {shape}" for shape, count in self.repeated()]
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# The request's log (debug middleware), and logs recording every thread (tests)
+_request_log: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+_global_logs: Set[QueryLog] = set()
+_global_lock = threading.Lock()
+
+
+def _record(statement: str, elapsed: float):
+    """Statement observer registered with app.metrics, which times every statement"""
+    request_log = _request_log.get()
+    if request_log is None and not _global_logs:
+        return
+    if request_log is not None:
+        request_log.record(statement, elapsed)
+    for log in list(_global_logs):
+        if log is not request_log:
+            log.record(statement, elapsed)
+
+
+statement_observers.append(_record)
+
+
+@contextmanager
+def count_queries():
+    """Record every statement executed on any engine, from any thread, until exit"""
+    log = QueryLog()
+    with _global_lock:
+        _global_logs.add(log)
+    try:
+        yield log
+    finally:
+        with _global_lock:
+            _global_logs.discard(log)
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: Optional[int] = None):
+    """Fail with QueryBudgetExceeded when the block runs more than `max_queries` statements,
+    or (with `max_repeats`) any single fingerprint more than `max_repeats` times"""
+    with count_queries() as log:
+        yield log
+    if log.count > max_queries:
+        raise QueryBudgetExceeded(f"Query budget {max_queries} exceeded: {log.report()}")
+    if max_repeats is not None:
+        over = [(shape, count) for shape, count in log.repeated() if count > max_repeats]
+        if over:
+            raise QueryBudgetExceeded(f"Statement repeated more than {max_repeats} times (N+1?): {log.report()}")
+
+
+class QueryDebugMiddleware:
+    """Pure ASGI middleware adding per-request statement counts as response headers"""
+
+    def __init__(self, app, repeat_warn: int = 5):
+        self.app = app
+        self.repeat_warn = repeat_warn
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+
+        async def send_with_counts(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-db-queries", str(log.count).encode("latin-1")),
+                    (b"x-db-time-ms", f"{log.sql_seconds * 1000:.1f}".encode("latin-1")),
+                    (b"x-db-repeated", str(log.repeated_count).encode("latin-1")),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counts)
+        finally:
+            _request_log.reset(token)
+            suspects = log.repeated(self.repeat_warn)
+            if suspects:
+                logger.warning(
+                    f"Possible N+1 on {scope['method']} {scope['path']}: {log.report()}",
+                    extra={"db_queries": log.count, "repeated": dict(suspects)},
+                )
@@ -0,0 +1,193 @@
+"""Read-replica routing for GET endpoints.
+
+With DATABASE_REPLICA_URLS set (comma-separated, e.g. two PostgreSQL
+standbys or two SQLite files for local testing), `get_read_db` hands out
+sessions on the replicas in round-robin order. Without it, reads use the
+primary exactly like `get_async_db`.
+
+- Health: a connection failure on a replica (a disconnect, failed connect
+  or failed pre-ping, seen through the engine's handle_error event) ejects it
+  for REPLICA_EJECT_SECONDS. Reads go to the remaining replicas, or to the
+  primary when none are left. After the window the replica gets traffic
+  again; another failure ejects it again.
+- Read-your-writes: handlers that write on behalf of a user call
+  `mark_recent_write(user_id)`, and that user's reads go to the primary for
+  REPLICA_STICKY_SECONDS, so replication lag never hides their own order
+  or favorite. The marks live in a cache namespace, so they are shared
+  across instances with CACHE_BACKEND=redis.
+"""
+from typing import Dict, List, Optional
+import itertools
+import logging
+import threading
+import time
+
+from fastapi import Request
+from sqlalchemy import event, orm
+
+from app.cache import create_cache
+from app.config import JWT_CONFIG, settings
+from app.database import (
+    AsyncSessionLocal, SessionLocal, async_url_for, make_async_engine, make_async_sessionmaker, make_engine, open_session,
+)
+from app.lazy import lazy_import
+from app.pool_stats import PoolTelemetry
+
+logger = logging.getLogger(__name__)
+
+jwt = lazy_import("jwt")
+
+
+def _safe_url(url: str) -> str:
+    """URL without the password, for logs and stats"""
+    scheme, _, rest = url.partition("://")
+    credentials, at, host = rest.rpartition("@")
+    if not at:
+        return url
+    return f"{scheme}://{credentials.split(':', 1)[0]}:***@{host}"
+
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.name = f"replica-{index}"
+        self.url = _safe_url(url)
+        self.telemetry = PoolTelemetry(self.name)
+        self.async_factory = None
+        self.sync_factory = None
+        try:
+            replica_engine = make_async_engine(async_url_for(url), self.telemetry)
+            self.async_factory = make_async_sessionmaker(replica_engine)
+            self._watch(replica_engine.sync_engine)
+        except Exception as e:
+            logger.warning(f"No async driver for {self.name}, using threadpool sessions: {e}")
+            replica_engine = make_engine(url, self.telemetry)
+            self.sync_factory = orm.sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+            self._watch(replica_engine)
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def _watch(self, sync_engine):
+        @event.listens_for(sync_engine, "handle_error")
+        def _on_error(context):
+            # Only a lost or refused connection says the replica is down; a
+            # statement error (timeout, missing table) is the query's problem
+            if context.is_disconnect or context.is_pre_ping or context.connection is None:
+                self.eject(context.original_exception)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def eject(self, error: BaseException):
+        self.failures += 1
+        self.last_error = str(error)[:200]
+        self.ejected_until = time.monotonic() + settings.replica_eject_seconds
+        logger.warning(f"Ejecting {self.name} for {settings.replica_eject_seconds:g}s: {self.last_error}")
+
+    def open(self):
+        self.reads += 1
+        return open_session(self.async_factory, self.sync_factory)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected_for_seconds": round(max(0.0, self.ejected_until - time.monotonic()), 1),
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": self.telemetry.snapshot(),
+        }
+
+
+class ReplicaSet:
+    def __init__(self, urls: List[str]):
+        self.replicas: List[Replica] = []
+        for index, url in enumerate(urls, start=1):
+            try:
+                self.replicas.append(Replica(index, url))
+            except Exception as e:
+                logger.warning(f"Could not create engine for replica {_safe_url(url)}: {e}")
+        self._order = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+        self.sticky_reads = 0
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None for the primary"""
+        if not self.replicas:
+            return None
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._order)]
+                if replica.healthy:
+                    return replica
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+        }
+
+
+def _configured_urls() -> List[str]:
+    return [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+
+
+replica_set = ReplicaSet(_configured_urls())
+
+# User id -> marker, present for REPLICA_STICKY_SECONDS after that user's last write
+recent_writes = create_cache("read-your-writes", ttl=settings.replica_sticky_seconds, max_entries=10000)
+
+
+def mark_recent_write(user_id: Optional[str]):
+    """Route `user_id`'s reads to the primary for the next REPLICA_STICKY_SECONDS"""
+    if user_id and replica_set.replicas:
+        recent_writes.set(user_id, b"1")
+
+
+def _request_user_id(request: Request) -> Optional[str]:
+    """User id from a valid bearer token, or None (anonymous reads are never sticky)"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_CONFIG["secret_key"], algorithms=[JWT_CONFIG["algorithm"]])
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get("sub")
+
+
+async def get_read_db(request: Request):
+    """Dependency for read-only handlers: a replica session when one is configured and healthy.
+
+    Use with `run_in_session` like `get_async_db`. Falls back to the primary
+    for users with a recent write and when every replica is ejected.
+    """
+    replica = None
+    if replica_set.replicas:
+        user_id = _request_user_id(request)
+        if user_id and await recent_writes.get_async(user_id) is not None:
+            replica_set.sticky_reads += 1
+        else:
+            replica = replica_set.choose()
+    if replica is None:
+        replica_set.primary_reads += 1
+        db = open_session(AsyncSessionLocal, SessionLocal)
+    else:
+        db = replica.open()
+
+    try:
+        yield db
+    except Exception as e:
+        logger.error(f"Database session error: {str(e)}")
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -3,11 +3,22 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 import uuid
-from passlib.context import CryptContext
-from app.routers.auth import verify_token
+from app.routers.auth import pwd_context, verify_token
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, run_in_session
 from app.models import Order as OrderModel, OrderItem as OrderItemModel, Product as ProductModel, User as UserModel
+from app.suggestions import suggestion_index
+from app.images import canonicalize_image_url
+from app.facets import adjust_facets, refresh_facets_if_enabled
+from app.categories import adjust_category_counts, sync_categories
+from app.cache import catalog_cache, role_cache, invalidate_product, invalidate_all
+from app.config import settings
+from app.pool_stats import async_pool_stats, sync_pool_stats
+from app.replicas import replica_set
+from app.fields import ADMIN_PRODUCT_COLUMNS, parse_fields, projected_columns, sparse_product
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -46,15 +57,22 @@ from app.routers.orders import orders_db
 admin_products = mock_products.copy()
 
 def check_admin_role(user_id: str, db: Session) -> bool:
-    """Check if user has admin role"""
+    """Check if user has admin role (role lookups are cached for ROLE_CACHE_TTL seconds)"""
+    cached = role_cache.get(user_id)
+    if cached is not None:
+        return cached == b"admin"
+    
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    return user and user.role == "admin"
+    role = (user.role or "") if user else ""
+    role_cache.set(user_id, role.encode("utf-8"))
+    return role == "admin"
 
 # Import the shared normalization function from products router
 from app.routers.products import _normalize_image_url
 
 @router.get("/stats", response_model=AdminStats)
-async def get_admin_stats(current_user_id: str = Depends(verify_token), db: Session = Depends(get_db)):
+@run_in_session
+def get_admin_stats(current_user_id: str = Depends(verify_token), db: Session = Depends(get_async_db)):
     """Get admin dashboard statistics"""
     if not check_admin_role(current_user_id, db):
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -81,10 +99,11 @@ async def get_admin_stats(current_user_id: str = Depends(verify_token), db: Sess
 
 # Product Management
 @router.post("/products", response_model=dict)
-async def create_product(
+@run_in_session
+def create_product(
     product: ProductCreate,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Create a new product"""
     if not check_admin_role(current_user_id, db):
@@ -101,14 +120,18 @@ async def create_product(
             description=product.description,
             price=product.price,
             category=product.category,
-            image_url=product.image_url,
+            image_url=canonicalize_image_url(product.image_url),
             stock=product.stock,
             rating=0.0
         )
         
         db.add(db_product)
+        adjust_facets(db, None, (db_product.category, db_product.price))
+        adjust_category_counts(db, None, db_product.category)
         db.commit()
         db.refresh(db_product)
+        suggestion_index.upsert_product(db_product.id, db_product.name, db_product.category, db_product.rating)
+        invalidate_product(product_id, [db_product.category])
         
         return {"message": "Product created successfully", "product_id": product_id}
     except Exception as e:
@@ -116,25 +139,43 @@ async def create_product(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/products", response_model=List[dict])
-async def get_admin_products(
+@run_in_session
+def get_admin_products(
     request: Request,
     current_user_id: str = Depends(verify_token),
     page: int = 1,
     limit: int = 1000,  # Increased default limit to 1000 to show all products
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,  # e.g. "id,name,price,stock" - only these columns are selected
+    db: Session = Depends(get_async_db)
 ):
     """Get all products for admin management"""
     if not check_admin_role(current_user_id, db):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
+        selected = parse_fields(fields, ADMIN_PRODUCT_COLUMNS, constants={})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        query = db.query(ProductModel)
+        if selected:
+            query = query.with_entities(*projected_columns(selected, ADMIN_PRODUCT_COLUMNS))
+        query = query.order_by(ProductModel.created_at.desc())
+        
         # Get products from database
         # If limit is very high (>= 1000), fetch all products without pagination
         if limit >= 1000:
-            db_products = db.query(ProductModel).order_by(ProductModel.created_at.desc()).all()
+            db_products = query.all()
         else:
             offset = (page - 1) * limit
-            db_products = db.query(ProductModel).order_by(ProductModel.created_at.desc()).offset(offset).limit(limit).all()
+            db_products = query.offset(offset).limit(limit).all()
+        
+        if selected:
+            return [
+                sparse_product(db_product, selected, lambda url: _normalize_image_url(url, request), constants={})
+                for db_product in db_products
+            ]
         
         # Convert to admin format
         products = []
@@ -158,11 +199,12 @@ async def get_admin_products(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/products/{product_id}")
-async def update_product(
+@run_in_session
+def update_product(
     product_id: str,
     product_update: ProductUpdate,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Update product information"""
     if not check_admin_role(current_user_id, db):
@@ -175,13 +217,21 @@ async def update_product(
             raise HTTPException(status_code=404, detail="Product not found")
         
         # Update fields
+        old_category = db_product.category
+        old_price = db_product.price
         update_data = product_update.dict(exclude_unset=True)
+        if "image_url" in update_data:
+            update_data["image_url"] = canonicalize_image_url(update_data["image_url"])
         for field, value in update_data.items():
             setattr(db_product, field, value)
         
-        db_product.updated_at = datetime.now()
+        db_product.updated_at = datetime.utcnow()  # Same clock as the model defaults (catalog ETags use max(updated_at))
+        adjust_facets(db, (old_category, old_price), (db_product.category, db_product.price))
+        adjust_category_counts(db, old_category, db_product.category)
         db.commit()
         db.refresh(db_product)
+        suggestion_index.upsert_product(db_product.id, db_product.name, db_product.category, db_product.rating)
+        invalidate_product(product_id, [old_category, db_product.category])
         
         return {"message": "Product updated successfully"}
     except Exception as e:
@@ -189,10 +239,11 @@ async def update_product(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/products/{product_id}")
-async def delete_product(
+@run_in_session
+def delete_product(
     product_id: str,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Delete a product"""
     if not check_admin_role(current_user_id, db):
@@ -205,22 +256,60 @@ async def delete_product(
             raise HTTPException(status_code=404, detail="Product not found")
         
         # Delete product
+        category = db_product.category
+        adjust_facets(db, (category, db_product.price), None)
+        adjust_category_counts(db, category, None)
         db.delete(db_product)
         db.commit()
+        suggestion_index.remove_product(product_id)
+        invalidate_product(product_id, [category])
         
         return {"message": "Product deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats")
+@run_in_session
+def get_cache_stats(current_user_id: str = Depends(verify_token), db: Session = Depends(get_async_db)):
+    """Get cache counters for tuning TTL and size"""
+    if not check_admin_role(current_user_id, db):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "catalog": catalog_cache.stats(),
+        "role": role_cache.stats()
+    }
+
+@router.get("/db/pool")
+@run_in_session
+def get_pool_stats(current_user_id: str = Depends(verify_token), db: Session = Depends(get_async_db)):
+    """Get connection pool occupancy and checkout latency, for sizing DB_POOL_SIZE against server concurrency"""
+    if not check_admin_role(current_user_id, db):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "settings": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_timeout": settings.db_pool_timeout,
+            "connect_timeout": settings.db_connect_timeout
+        },
+        "sync": sync_pool_stats.snapshot(),
+        "async": async_pool_stats.snapshot(),
+        "read_replicas": replica_set.stats()
+    }
+
 # Order Management
 @router.get("/orders", response_model=List[dict])
-async def get_admin_orders(
+@run_in_session
+def get_admin_orders(
     current_user_id: str = Depends(verify_token),
     page: int = 1,
     limit: int = 20,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Get all orders for admin management"""
     if not check_admin_role(current_user_id, db):
@@ -234,26 +323,36 @@ async def get_admin_orders(
         
         orders = query.offset((page - 1) * limit).limit(limit).all()
         
+        # Users, items and product images for the whole page: one query each
+        users, items_by_order, image_urls = {}, {}, {}
+        if orders:
+            user_ids = {order.user_id for order in orders}
+            users = {user.id: user for user in db.query(UserModel).filter(UserModel.id.in_(user_ids)).all()}
+            order_items = db.query(OrderItemModel).filter(
+                OrderItemModel.order_id.in_([order.id for order in orders])
+            ).all()
+            for item in order_items:
+                items_by_order.setdefault(item.order_id, []).append(item)
+            product_ids = {item.product_id for item in order_items}
+            if product_ids:
+                image_urls = dict(
+                    db.query(ProductModel.id, ProductModel.image_url).filter(ProductModel.id.in_(product_ids)).all()
+                )
+        
         # Convert orders to admin format
         admin_orders_list = []
         for order in orders:
-            # Get user info for the order
-            user = db.query(UserModel).filter(UserModel.id == order.user_id).first()
-            
-            # Get order items with product details
-            order_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == order.id).all()
+            user = users.get(order.user_id)
             
-            # Get product details for each item
             items_with_details = []
-            for item in order_items:
-                product = db.query(ProductModel).filter(ProductModel.id == item.product_id).first()
+            for item in items_by_order.get(order.id, []):
                 items_with_details.append({
                     "product_id": item.product_id,
                     "name": item.name,
                     "quantity": item.quantity,
                     "price": item.price,
                     "subtotal": item.price * item.quantity,
-                    "image_url": product.image_url if product else None
+                    "image_url": image_urls.get(item.product_id)
                 })
             
             admin_order = {
@@ -283,11 +382,12 @@ class OrderUpdate(BaseModel):
     notes: Optional[str] = None
 
 @router.put("/orders/{order_id}")
-async def update_order(
+@run_in_session
+def update_order(
     order_id: str,
     order_update: OrderUpdate,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Update order details"""
     if not check_admin_role(current_user_id, db):
@@ -317,9 +417,7 @@ async def update_order(
         raise
     except Exception as e:
         db.rollback()
-        import traceback
-        error_detail = f"Failed to update order: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ Error in update_order: {error_detail}", flush=True)
+        logger.exception(f"Error in update_order: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to update order: {str(e)}")
 
 @router.get("/orders/{order_id}")
@@ -340,15 +438,13 @@ async def get_admin_order(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return pwd_context.hash(password)
 
 @router.post("/init-database")
-async def initialize_database(db: Session = Depends(get_db)):
+@run_in_session
+def initialize_database(db: Session = Depends(get_async_db)):
     """Initialize database with admin user and sample products"""
     try:
         # Check if admin user already exists
@@ -473,6 +569,10 @@ async def initialize_database(db: Session = Depends(get_db)):
         
         # Commit all changes
         db.commit()
+        sync_categories(db)
+        refresh_facets_if_enabled(db)
+        suggestion_index.rebuild(db)
+        invalidate_all()
         
         return {
             "message": "Database initialized successfully",
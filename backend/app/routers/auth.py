@@ -4,17 +4,26 @@ from pydantic import BaseModel
 from typing import Optional
 from app.config import JWT_CONFIG
 from datetime import datetime, timedelta
-import jwt
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.lazy import Lazy, lazy_import
 from app.models import User
-from passlib.context import CryptContext
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer()
 
+# PyJWT and passlib/bcrypt are imported on first use, not at startup
+jwt = lazy_import("jwt")
+
+def _crypt_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = Lazy(_crypt_context, "pwd_context")
 
 # Pydantic models
 class UserLogin(BaseModel):
@@ -153,10 +162,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         # Log the actual error for debugging
-        import traceback
-        error_msg = f"Login error: {str(e)}"
-        print(f"❌ {error_msg}", flush=True)
-        traceback.print_exc()
+        logger.exception(f"Login error: {str(e)}")
         raise HTTPException(
             status_code=500, 
             detail=f"Internal server error during login: {str(e)}"
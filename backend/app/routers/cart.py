@@ -2,8 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List
 from app.routers.auth import verify_token
-from app.database import get_db
-from app.models import Product
+from app.database import get_async_db, run_in_session
+from app.routers.products import _products_by_ids
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -60,15 +60,17 @@ async def get_cart(current_user_id: str = Depends(verify_token)):
     )
 
 @router.post("/add", response_model=CartResponse)
-async def add_to_cart(request: AddToCartRequest, current_user_id: str = Depends(verify_token), db: Session = Depends(get_db)):
+@run_in_session
+def add_to_cart(request: AddToCartRequest, current_user_id: str = Depends(verify_token), db: Session = Depends(get_async_db)):
     """Add item to cart"""
     cart = get_user_cart(current_user_id)
     
     # Get real product data from database
     try:
-        product = db.query(Product).filter(Product.id == request.product_id).first()
-        if not product:
+        found, _ = _products_by_ids(db, [request.product_id])
+        if not found:
             raise HTTPException(status_code=404, detail="Product not found")
+        product = found[0]
         
         product_data = {
             "id": product.id,
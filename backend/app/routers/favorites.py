@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app.routers.auth import verify_token
-from app.database import get_db, engine
-from app.models import Favorite, Product, Base
+from app.database import get_async_db, run_in_session
+from app.replicas import get_read_db, mark_recent_write
+from app.models import Favorite
+from app.routers.products import _normalize_image_url, _products_by_ids
+from app.serialization import dumps
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -30,15 +37,14 @@ class FavoriteListResponse(BaseModel):
     favorites: List[FavoriteProductResponse]
 
 @router.get("/", response_model=List[FavoriteProductResponse])
-async def get_favorites(
+@run_in_session
+def get_favorites(
+    request: Request,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's favorite products"""
     try:
-        # Ensure favorites table exists
-        Base.metadata.create_all(bind=engine)
-        
         # Get all favorite product IDs for the user
         favorites = db.query(Favorite).filter(
             Favorite.user_id == current_user_id
@@ -50,48 +56,43 @@ async def get_favorites(
         # Get product IDs
         product_ids = [fav.product_id for fav in favorites]
         
-        # Fetch product details
-        products = db.query(Product).filter(
-            Product.id.in_(product_ids)
-        ).all()
-        
-        # Convert to response format
-        result = []
-        for product in products:
-            result.append(FavoriteProductResponse(
-                id=product.id,
-                name=product.name,
-                description=product.description or "",
-                price=product.price,
-                currency="USD",
-                category=product.category or "",
-                image_url=product.image_url or "",
-                stock=product.stock or 0,
-                rating=product.rating,
-                review_count=0  # Can be added later if you track reviews
-            ))
-        
-        return result
+        # Fetch product details in one query, in favorites order
+        products, _ = _products_by_ids(db, product_ids)
+        
+        # Rows are encoded directly; the shape matches FavoriteProductResponse
+        result = [
+            {
+                "id": product.id,
+                "name": product.name,
+                "description": product.description or "",
+                "price": product.price,
+                "currency": "USD",
+                "category": product.category or "",
+                "image_url": _normalize_image_url(product.image_url, request) or "",
+                "stock": product.stock or 0,
+                "rating": product.rating,
+                "review_count": 0  # Can be added later if you track reviews
+            }
+            for product in products
+        ]
+        
+        return Response(content=dumps(result), media_type="application/json")
     except Exception as e:
-        import traceback
-        error_detail = f"Failed to get favorites: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ Error in get_favorites: {error_detail}", flush=True)
+        logger.exception(f"Error in get_favorites: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get favorites: {str(e)}")
 
 @router.post("/{product_id}")
-async def add_favorite(
+@run_in_session
+def add_favorite(
     product_id: str,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Add a product to favorites"""
     try:
-        # Ensure favorites table exists
-        Base.metadata.create_all(bind=engine)
-        
         # Check if product exists
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if not product:
+        found, _ = _products_by_ids(db, [product_id])
+        if not found:
             raise HTTPException(status_code=404, detail="Product not found")
         
         # Check if already favorited
@@ -113,28 +114,25 @@ async def add_favorite(
         db.add(favorite)
         db.commit()
         db.refresh(favorite)
+        mark_recent_write(current_user_id)
         
         return {"message": "Product added to favorites", "product_id": product_id}
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        import traceback
-        error_detail = f"Failed to add favorite: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ Error in add_favorite: {error_detail}", flush=True)
+        logger.exception(f"Error in add_favorite: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to add favorite: {str(e)}")
 
 @router.delete("/{product_id}")
-async def remove_favorite(
+@run_in_session
+def remove_favorite(
     product_id: str,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Remove a product from favorites"""
     try:
-        # Ensure favorites table exists
-        Base.metadata.create_all(bind=engine)
-        
         favorite = db.query(Favorite).filter(
             and_(
                 Favorite.user_id == current_user_id,
@@ -147,28 +145,25 @@ async def remove_favorite(
         
         db.delete(favorite)
         db.commit()
+        mark_recent_write(current_user_id)
         
         return {"message": "Product removed from favorites", "product_id": product_id}
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        import traceback
-        error_detail = f"Failed to remove favorite: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ Error in remove_favorite: {error_detail}", flush=True)
+        logger.exception(f"Error in remove_favorite: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to remove favorite: {str(e)}")
 
 @router.get("/check/{product_id}")
-async def check_favorite(
+@run_in_session
+def check_favorite(
     product_id: str,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Check if a product is favorited by the user"""
     try:
-        # Ensure favorites table exists
-        Base.metadata.create_all(bind=engine)
-        
         favorite = db.query(Favorite).filter(
             and_(
                 Favorite.user_id == current_user_id,
@@ -178,8 +173,6 @@ async def check_favorite(
         
         return {"is_favorited": favorite is not None}
     except Exception as e:
-        import traceback
-        error_detail = f"Failed to check favorite: {str(e)}\n{traceback.format_exc()}"
-        print(f"❌ Error in check_favorite: {error_detail}", flush=True)
+        logger.exception(f"Error in check_favorite: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to check favorite: {str(e)}")
 
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
 from datetime import datetime
 from app.routers.auth import verify_token
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, run_in_session
+from app.replicas import get_read_db, mark_recent_write
 from app.models import Order as OrderModel, OrderItem as OrderItemModel
+from app.serialization import dumps
 
 router = APIRouter()
 
@@ -55,11 +58,22 @@ orders_db = {}
 def generate_order_id():
     return f"order_{len(orders_db) + 1}_{int(datetime.now().timestamp())}"
 
+def _shipping_address(value) -> Optional[dict]:
+    """Stored address as a ShippingAddress dict, or None for legacy data
+    (addresses saved as strings or missing fields)"""
+    if not isinstance(value, dict):
+        return None
+    try:
+        return ShippingAddress.model_validate(value).model_dump()
+    except ValidationError:
+        return None
+
 @router.post("/", response_model=Order)
-async def create_order(
+@run_in_session
+def create_order(
     request: CreateOrderRequest,
     current_user_id: str = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_async_db)
 ):
     """Create a new order from cart"""
     try:
@@ -126,6 +140,8 @@ async def create_order(
         
         db.commit()
         db.refresh(db_order)
+        # The user's next order-history reads must see this order
+        mark_recent_write(current_user_id)
         
         # Clear the user's cart after creating order
         if current_user_id in carts_db:
@@ -153,69 +169,59 @@ async def create_order(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=OrderList)
+@run_in_session
 def get_user_orders(
     current_user_id: str = Depends(verify_token),
     page: int = 1,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's order history"""
     try:
-        # Get orders from database
-        db_orders = db.query(OrderModel).filter(OrderModel.user_id == current_user_id).all()
+        # Count and page in the database, newest first
+        query = db.query(OrderModel).filter(OrderModel.user_id == current_user_id)
+        total = query.count()
+        paginated_orders = query.order_by(OrderModel.created_at.desc(), OrderModel.id.desc()).offset(
+            (max(page, 1) - 1) * limit
+        ).limit(limit).all()
+        
+        # Get order items for the whole page in one query
+        items_by_order = {}
+        if paginated_orders:
+            order_items = db.query(OrderItemModel).filter(
+                OrderItemModel.order_id.in_([db_order.id for db_order in paginated_orders])
+            ).all()
+            for item in order_items:
+                items_by_order.setdefault(item.order_id, []).append({
+                    "product_id": item.product_id,
+                    "name": item.name,
+                    "price": item.price,
+                    "quantity": item.quantity,
+                    "subtotal": item.subtotal,
+                    "image_url": item.image_url
+                })
         
-        # Convert to Pydantic models
+        # Rows are encoded directly, so the response_model is not applied;
+        # the address is the one free-form column and is validated here
         orders = []
-        for db_order in db_orders:
-            # Get order items
-            order_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == db_order.id).all()
-            
-            # Convert to OrderItem Pydantic models
-            items = [
-                OrderItem(
-                    product_id=item.product_id,
-                    name=item.name,
-                    price=item.price,
-                    quantity=item.quantity,
-                    subtotal=item.subtotal,
-                    image_url=item.image_url
-                ) for item in order_items
-            ]
+        for db_order in paginated_orders:
+            shipping_address = _shipping_address(db_order.shipping_address)
             
-            # Convert shipping address back to Pydantic model
-            if db_order.shipping_address:
-                if isinstance(db_order.shipping_address, dict):
-                    shipping_address = ShippingAddress(**db_order.shipping_address)
-                else:
-                    # Handle cases where shipping_address is stored as a string (legacy data)
-                    shipping_address = None
-            else:
-                shipping_address = None
-            
-            order = Order(
-                id=db_order.id,
-                user_id=db_order.user_id,
-                items=items,
-                shipping_address=shipping_address,
-                subtotal=db_order.subtotal,
-                tax=db_order.tax,
-                shipping=db_order.shipping,
-                total=db_order.total,
-                status=db_order.status,
-                created_at=db_order.created_at,
-                updated_at=db_order.updated_at
-            )
-            orders.append(order)
+            orders.append({
+                "id": db_order.id,
+                "user_id": db_order.user_id,
+                "items": items_by_order.get(db_order.id, []),
+                "shipping_address": shipping_address,
+                "subtotal": db_order.subtotal,
+                "tax": db_order.tax,
+                "shipping": db_order.shipping,
+                "total": db_order.total,
+                "status": db_order.status,
+                "created_at": db_order.created_at,
+                "updated_at": db_order.updated_at
+            })
         
-        # Simple pagination
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_orders = orders[start_idx:end_idx]
-        
-        return OrderList(
-            orders=paginated_orders,
-            total=len(orders)
-        )
+        return Response(content=dumps({"orders": orders, "total": total}), media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
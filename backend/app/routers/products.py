@@ -1,9 +1,28 @@
 from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Optional
+from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import Session
-from app.database import get_db
+import base64
+import json
+from app.database import get_async_db, run_in_session
+from app.replicas import get_read_db
 from app.models import Product as ProductModel
+from app.search import apply_search
+from app.suggestions import suggestion_index
+from app.cache import catalog_cache, catalog_key, catalog_version, make_etag, etag_matches
+from app.config import settings
+from app.images import resolve_image_url
+from app.facets import compute_facets, parse_bucket_edges
+from app.categories import list_categories
+from app.featured import featured_products
+from app.counts import COUNT_MODES, count_products
+from app.serialization import dumps
+from app.fields import PRODUCT_COLUMNS, parse_fields, projected_columns, sparse_product
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -22,17 +41,44 @@ class Product(BaseModel):
 
 class ProductList(BaseModel):
     products: List[Product]
-    total: int
+    total: Optional[int] = None  # Not computed in cursor mode
+    total_exact: bool = True
+    total_label: Optional[str] = None  # "~N" (estimated) or "N+" (capped) when total_exact is false
     page: int
     limit: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
+
+class ProductBatch(BaseModel):
+    products: List[Product]  # In requested order
+    missing: List[str]  # Requested ids with no product
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str]
+
+class CategoryFacet(BaseModel):
+    name: str
+    count: int
+
+class PriceRangeFacet(BaseModel):
+    label: str
+    min: float
+    max: Optional[float] = None
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_ranges: List[PriceRangeFacet]
+    total: int
+    source: str  # "live" or "precomputed"
 
 class Category(BaseModel):
     id: str
     name: str
     description: Optional[str] = None
     image_url: Optional[str] = None
+    product_count: Optional[int] = None
 
 # Mock data for development (replace with API calls in production)
 mock_products = [
@@ -143,124 +189,168 @@ mock_categories = [
 ]
 
 def _normalize_image_url(raw_url: Optional[str], request: Request) -> Optional[str]:
-    """Normalize image URLs to avoid mixed content and host mismatches.
-    - If GCS is configured and URL is /uploads/ path, return GCS URL directly
-    - Force https for any http URLs not pointing to localhost
-    - Rewrite localhost/0.0.0.0/127.0.0.1 to current request host
-    - Prefix relative '/uploads' with current host and scheme (if GCS not configured)
+    """Resolve a stored image URL for the current request host.
+    See app.images - resolution is memoized per (stored URL, request base).
     """
-    print(f"🔍 _normalize_image_url called with: {raw_url}", flush=True)
-    if not raw_url:
-        print(f"   raw_url is None/empty, returning as-is", flush=True)
-        return raw_url
-
-    url = raw_url.strip()
-    base = str(request.base_url).rstrip('/')
-    print(f"   Processing URL: '{url}', base: '{base}'", flush=True)
-
-    # If URL is already a full GCS URL, return it as-is
-    if url.startswith('https://storage.googleapis.com') or url.startswith('https://storage.cloud.google.com'):
-        print(f"✅ URL is already a GCS URL: {url[:100]}...", flush=True)
-        return url
-
-    # Extract /uploads/ path from full backend URLs (e.g., "https://backend.../uploads/file.jpg" -> "/uploads/file.jpg")
-    if '/uploads/' in url:
-        # Extract just the /uploads/... part
-        uploads_index = url.find('/uploads/')
-        url = url[uploads_index:]
-        print(f"   Extracted /uploads path from full URL: {url}", flush=True)
-
-    # Relative upload path - try to get GCS URL directly if GCS is configured
-    if url.startswith('/uploads'):
-        import os
-        GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "")
-        print(f"🔍 Normalizing /uploads URL: {url}, GCS_BUCKET_NAME: {GCS_BUCKET_NAME}", flush=True)
-        if GCS_BUCKET_NAME:
-            # Extract filename from path (e.g., "/uploads/filename.jpg" -> "filename.jpg")
-            filename = url.replace('/uploads/', '').lstrip('/')
-            print(f"   Extracted filename: {filename}", flush=True)
-            if filename:
-                try:
-                    from google.cloud import storage
-                    from datetime import timedelta
-                    
-                    print(f"   Creating GCS client...", flush=True)
-                    client = storage.Client()
-                    bucket = client.bucket(GCS_BUCKET_NAME)
-                    blob_path = f"uploads/{filename}"
-                    blob = bucket.blob(blob_path)
-                    print(f"   Blob path: {blob_path}", flush=True)
-                    
-                    # Use public URL directly (bucket is already public, no need to make blobs public)
-                    # This is much faster - just construct the URL without API calls
-                    public_url = f"https://storage.googleapis.com/{GCS_BUCKET_NAME}/{blob_path}"
-                    print(f"✅ Using public GCS URL: {public_url}", flush=True)
-                    return public_url
-                except Exception as e:
-                    print(f"❌ ERROR getting GCS URL for {filename}: {e}", flush=True)
-                    import traceback
-                    traceback.print_exc()
-        else:
-            print(f"⚠️ GCS not configured (GCS_BUCKET_NAME is empty), using backend URL for {url}", flush=True)
-        
-        # Fallback to backend URL if GCS not configured or lookup failed
-        backend_url = f"{base}{url}"
-        print(f"📎 Falling back to backend URL: {backend_url}", flush=True)
-        return backend_url
-
-    # Localhost variants -> current host
-    localhost_prefixes = (
-        'http://localhost', 'http://127.0.0.1', 'http://0.0.0.0',
-        'https://localhost', 'https://127.0.0.1', 'https://0.0.0.0',
-    )
-    if url.startswith(localhost_prefixes):
-        # keep path/query, replace origin with current base
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            path_and_query = parsed.path or ''
-            if parsed.query:
-                path_and_query += f"?{parsed.query}"
-            return f"{base}{path_and_query}"
-        except Exception:
-            return base
+    return resolve_image_url(raw_url, str(request.base_url).rstrip('/'))
+
+
+# Sortable columns for product listings. NULLs are coalesced so that keyset
+# comparisons behave the same way as the ORDER BY.
+SORT_COLUMNS = {
+    "name": (ProductModel.name, ""),
+    "price": (ProductModel.price, 0.0),
+    "rating": (ProductModel.rating, 0.0),
+}
 
-    # Generic http -> https
-    if url.startswith('http://'):
-        return 'https://' + url[len('http://'):]
+def _product_dict(db_product, request: Request) -> dict:
+    """Product response for an ORM row as a plain dict (same shape as `Product`)"""
+    return {
+        "id": db_product.id,
+        "name": db_product.name,
+        "description": db_product.description,
+        "price": db_product.price,
+        "currency": "USD",
+        "category": db_product.category,
+        "image_url": _normalize_image_url(db_product.image_url, request),
+        "stock": db_product.stock,
+        "rating": db_product.rating,
+        "review_count": 0,  # We can add review count later
+    }
+
+def _catalog_headers(etag: Optional[str]) -> dict:
+    if not etag:
+        return {}
+    return {"ETag": etag, "Cache-Control": f"public, max-age={settings.catalog_max_age}"}
 
-    return url
+def _json_response(body: bytes, etag: Optional[str] = None) -> Response:
+    """Return an already-serialized JSON body (skips response_model re-validation)"""
+    return Response(content=body, media_type="application/json", headers=_catalog_headers(etag))
 
+def _catalog_version(db: Session) -> Optional[str]:
+    """The catalog version, or None if it cannot be read (ETags are then skipped)"""
+    try:
+        return catalog_version(db)
+    except Exception as e:
+        # The failed statement leaves the transaction aborted on PostgreSQL
+        db.rollback()
+        logger.warning(f"Could not compute catalog ETag: {e}")
+        return None
+
+def _check_not_modified(request: Request, version: Optional[str], cache_key: str):
+    """Compute the ETag for `cache_key` at catalog `version` (from `_catalog_version`).
+
+    Returns (etag, versioned cache key, response) where response is a 304
+    if the client's If-None-Match already matches, else None. Cached
+    bodies are stored under the versioned key so a body is never served
+    with another version's ETag. Without a version the ETag is None and
+    the key is returned unchanged.
+    """
+    if version is None:
+        return None, cache_key, None
+    etag = make_etag(version, cache_key)
+    versioned_key = f"{version}|{cache_key}"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return etag, versioned_key, Response(status_code=304, headers=_catalog_headers(etag))
+    return etag, versioned_key, None
+
+# Most ids accepted by one /batch request
+BATCH_MAX_IDS = 250
+
+def _products_by_ids(db: Session, ids: List[str]):
+    """Load products for `ids` with a single IN query.
+
+    Returns (products in the order of `ids`, ids with no product). Blank
+    and repeated ids are dropped.
+    """
+    wanted = list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+    if not wanted:
+        return [], []
+    by_id = {p.id: p for p in db.query(ProductModel).filter(ProductModel.id.in_(wanted)).all()}
+    found = [by_id[i] for i in wanted if i in by_id]
+    missing = [i for i in wanted if i not in by_id]
+    return found, missing
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields, PRODUCT_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _encode_cursor(sort_by: str, sort_order: str, last_value, last_id: str) -> str:
+    """Encode the sort key and id of the last row on a page as an opaque cursor"""
+    payload = json.dumps({"s": sort_by, "o": sort_order, "v": last_value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str):
+    """Decode a cursor and check it was issued for the same sort; returns (last_value, last_id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_value, last_id = payload["v"], payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/sort_order")
+    return last_value, last_id
 
 @router.get("/", response_model=ProductList)
-async def get_products(
+@run_in_session
+def get_products(
     request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor (use instead of page)"),
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search query"),
     min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
     max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
-    sort_by: Optional[str] = Query("name", description="Sort by field"),
+    sort_by: Optional[str] = Query("name", description="Sort by field (name/price/rating/relevance)"),
     sort_order: Optional[str] = Query("asc", description="Sort order (asc/desc)"),
-    db: Session = Depends(get_db)
+    count_mode: str = Query("exact", description="Total count: exact, estimated (planner estimate) or capped (at COUNT_CAP)"),
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return, e.g. id,name,price,image_url,rating"),
+    db: Session = Depends(get_read_db)
 ):
-    """Get products with filtering, searching, and pagination"""
+    """Get products with filtering, searching, and pagination.
+
+    Page-number pagination returns the total count, computed according to
+    `count_mode`. Cursor pagination (pass `cursor=` from a previous
+    `next_cursor`) seeks past the last row instead of using OFFSET and skips
+    the count query. `fields=` selects and returns only the listed columns.
+    """
+    count_mode = (count_mode or "exact").lower()
+    if count_mode not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count_mode must be one of: {', '.join(COUNT_MODES)}")
+    selected = _parse_fields(fields)
+    cache_key = catalog_key(
+        "products", str(request.base_url),
+        page=None if cursor else page, limit=limit, cursor=cursor,
+        category=category, search=search,
+        min_price=min_price, max_price=max_price,
+        sort_by=sort_by, sort_order=(sort_order or "").lower(),
+        count_mode=None if cursor else count_mode,
+        fields=",".join(selected) if selected else None,
+    )
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
     try:
         # Start with base query
         query = db.query(ProductModel)
         
-        # Apply category filter
+        # Apply category filter (exact name, served by the category index)
         if category:
-            query = query.filter(ProductModel.category.ilike(f"%{category}%"))
+            query = query.filter(ProductModel.category == category.strip())
         
-        # Apply search filter
+        # Apply search filter (full-text on PostgreSQL, ILIKE elsewhere)
+        rank = None
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                ProductModel.name.ilike(search_term) | 
-                ProductModel.description.ilike(search_term)
-            )
+            query, rank = apply_search(query, search, db, ProductModel)
         
         # Apply price filters
         if min_price is not None:
@@ -268,115 +358,285 @@ async def get_products(
         if max_price is not None:
             query = query.filter(ProductModel.price <= max_price)
         
-        # Apply sorting
-        if sort_by == "name":
-            query = query.order_by(ProductModel.name.asc() if sort_order.lower() == "asc" else ProductModel.name.desc())
-        elif sort_by == "price":
-            query = query.order_by(ProductModel.price.asc() if sort_order.lower() == "asc" else ProductModel.price.desc())
-        elif sort_by == "rating":
-            query = query.order_by(ProductModel.rating.asc() if sort_order.lower() == "asc" else ProductModel.rating.desc())
+        # Apply sorting - id is the tie-breaker so the order is total and cursors are stable
+        sort_order = "desc" if (sort_order or "").lower() == "desc" else "asc"
+        column = None
+        if sort_by == "relevance" and rank is not None:
+            # Most relevant first; sort_order does not apply
+            if cursor:
+                raise HTTPException(status_code=400, detail="Cursor pagination is not supported for sort_by=relevance")
+            query = query.order_by(rank.desc(), ProductModel.id.asc())
         else:
-            query = query.order_by(ProductModel.name.asc())
-        
-        # Get total count
-        total = query.count()
+            if sort_by not in SORT_COLUMNS:
+                sort_by = "name"
+            column, null_value = SORT_COLUMNS[sort_by]
+            # NULLs sort as `null_value` in page and cursor mode alike, so a
+            # cursor taken from any page seeks to the same place
+            sort_key = func.coalesce(column, null_value)
+            if sort_order == "asc":
+                query = query.order_by(sort_key.asc(), ProductModel.id.asc())
+            else:
+                query = query.order_by(sort_key.desc(), ProductModel.id.desc())
         
-        # Apply pagination
-        offset = (page - 1) * limit
-        db_products = query.offset(offset).limit(limit).all()
+        if selected:
+            # Select only the requested columns (plus the cursor's sort column)
+            query = query.with_entities(*projected_columns(selected, PRODUCT_COLUMNS, [sort_by] if column is not None else []))
         
-        # Convert to Product objects
-        products = []
-        for db_product in db_products:
-            product = Product(
-                id=db_product.id,
-                name=db_product.name,
-                description=db_product.description,
-                price=db_product.price,
-                currency="USD",
-                category=db_product.category,
-                image_url=_normalize_image_url(db_product.image_url, request),
-                stock=db_product.stock,
-                rating=db_product.rating,
-                review_count=0  # We can add review count later
+        if cursor:
+            # Keyset pagination: seek past the last (sort key, id) seen
+            last_value, last_id = _decode_cursor(cursor, sort_by, sort_order)
+            if sort_order == "asc":
+                query = query.filter(or_(sort_key > last_value, and_(sort_key == last_value, ProductModel.id > last_id)))
+            else:
+                query = query.filter(or_(sort_key < last_value, and_(sort_key == last_value, ProductModel.id < last_id)))
+            
+            # Fetch one extra row to know whether there is a next page
+            db_products = query.limit(limit + 1).all()
+            has_next = len(db_products) > limit
+            db_products = db_products[:limit]
+            total, total_exact, total_label = None, True, None
+            has_prev = True
+        else:
+            # Get total count - exact counts are cached per filter signature until the next catalog write
+            count_key = catalog_key(
+                "products-count", "",
+                category=category, search=search, min_price=min_price, max_price=max_price,
+            )
+            total, total_exact, total_label = count_products(
+                db, query, count_mode,
+                filtered=bool(category or search or min_price is not None or max_price is not None),
+                cap=settings.count_cap,
+                cache_key=f"{version}|{count_key}" if version is not None else None,
+                tags=[f"category:{category.strip()}"] if category else ["catalog"],
             )
-            products.append(product)
+            
+            # Apply pagination
+            offset = (page - 1) * limit
+            if total_exact:
+                db_products = query.offset(offset).limit(limit).all()
+                has_next = offset + limit < total
+            else:
+                # The total is approximate, so look one row ahead instead
+                db_products = query.offset(offset).limit(limit + 1).all()
+                has_next = len(db_products) > limit
+                db_products = db_products[:limit]
+            has_prev = page > 1
         
-        return ProductList(
-            products=products,
-            total=total,
-            page=page,
-            limit=limit,
-            has_next=offset + limit < total,
-            has_prev=page > 1
-        )
+        # Convert rows to response dicts
+        if selected:
+            products = [sparse_product(row, selected, lambda url: _normalize_image_url(url, request)) for row in db_products]
+        else:
+            products = [_product_dict(db_product, request) for db_product in db_products]
+        
+        next_cursor = None
+        if has_next and db_products and column is not None:
+            last = db_products[-1]
+            last_value = getattr(last, column.key)
+            next_cursor = _encode_cursor(sort_by, sort_order, null_value if last_value is None else last_value, last.id)
+        
+        # Rows are encoded directly; the shape matches ProductList
+        body = dumps({
+            "products": products,
+            "total": total,
+            "total_exact": total_exact,
+            "total_label": total_label,
+            "page": page,
+            "limit": limit,
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor,
+        })
         
+        # Category-filtered listings only change when a product in a matching category does
+        tags = [f"category:{category.strip()}"] if category else ["catalog"]
+        catalog_cache.set(cache_key, body, tags)
+        return _json_response(body, etag)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# /categories, /facets and /featured build their derived tables on first use, so they stay on the primary
+
 @router.get("/categories", response_model=List[Category])
-async def get_categories(db: Session = Depends(get_db)):
+@run_in_session
+def get_categories(request: Request, db: Session = Depends(get_async_db)):
     """Get all product categories from database"""
+    cache_key = catalog_key("categories", "")
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
     try:
-        # Get unique categories from database
-        categories = db.query(ProductModel.category).distinct().all()
-        
-        # Convert to Category objects
-        category_list = []
-        for idx, (category_name,) in enumerate(categories, start=1):
-            if category_name:  # Only add non-empty categories
-                category_list.append(Category(
-                    id=str(idx),
-                    name=category_name,
-                    description=f"Products in {category_name} category"
-                ))
+        # Read the materialized categories table (stable ids, maintained counts)
+        category_list = [
+            Category(
+                id=str(category.id),
+                name=category.name,
+                description=category.description,
+                image_url=category.image_url,
+                product_count=category.product_count
+            )
+            for category in list_categories(db)
+        ]
         
         # If no categories in database, return mock categories as fallback
         if not category_list:
             category_list = [Category(**c) for c in mock_categories]
         
-        return category_list
+        body = dumps([c.model_dump() for c in category_list])
+        catalog_cache.set(cache_key, body, ["catalog"])
+        return _json_response(body, etag)
     except Exception as e:
-        print(f"Error in categories: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in categories: {e}")
         # Fallback to mock categories on error
         try:
             return [Category(**c) for c in mock_categories]
         except Exception as fallback_error:
             raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@router.get("/facets", response_model=ProductFacets)
+@run_in_session
+def get_product_facets(
+    request: Request,
+    category: Optional[str] = Query(None, description="Filter by category"),
+    search: Optional[str] = Query(None, description="Search query"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    price_buckets: Optional[str] = Query(None, description="Comma-separated price bucket edges, e.g. 25,50,100"),
+    db: Session = Depends(get_async_db)
+):
+    """Get per-category and per-price-range product counts for the current filters.
+    Category counts ignore the category filter and price counts ignore the price filter.
+    """
+    try:
+        edges = parse_bucket_edges(price_buckets) if price_buckets else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="price_buckets must be comma-separated positive numbers")
+    
+    cache_key = catalog_key(
+        "facets", "",
+        category=category, search=search,
+        min_price=min_price, max_price=max_price,
+        price_buckets=",".join(f"{edge:g}" for edge in edges) if edges is not None else None,
+    )
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
+    try:
+        facets = compute_facets(db, category=category, search=search, min_price=min_price, max_price=max_price, edges=edges)
+        body = ProductFacets(**facets).model_dump_json().encode("utf-8")
+        catalog_cache.set(cache_key, body, ["catalog"])
+        return _json_response(body, etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/featured", response_model=List[Product])
-async def get_featured_products(request: Request, db: Session = Depends(get_db)):
-    """Get featured products (highly rated or popular)"""
+@run_in_session
+def get_featured_products(
+    request: Request,
+    # Only FEATURED_SIZE products are ranked
+    limit: int = Query(3, ge=1, le=settings.featured_size, description="Number of featured products"),
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return"),
+    db: Session = Depends(get_async_db)
+):
+    """Get featured products from the precomputed ranking (rating, stock and recent sales)"""
+    selected = _parse_fields(fields)
+    cache_key = catalog_key("featured", str(request.base_url), limit=limit, fields=",".join(selected) if selected else None)
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
     try:
-        # Get top 3 products by rating
-        db_products = db.query(ProductModel).order_by(ProductModel.rating.desc()).limit(3).all()
+        # Read in ranking order from the featured_products table
+        db_products = featured_products(db, limit, projected_columns(selected, PRODUCT_COLUMNS) if selected else None)
         
-        products = []
-        for db_product in db_products:
-            product = Product(
-                id=db_product.id,
-                name=db_product.name,
-                description=db_product.description,
-                price=db_product.price,
-                currency="USD",
-                category=db_product.category,
-                image_url=_normalize_image_url(db_product.image_url, request),
-                stock=db_product.stock,
-                rating=db_product.rating,
-                review_count=0
-            )
-            products.append(product)
+        if selected:
+            products = [sparse_product(row, selected, lambda url: _normalize_image_url(url, request)) for row in db_products]
+        else:
+            products = [_product_dict(db_product, request) for db_product in db_products]
         
-        return products
+        body = dumps(products)
+        catalog_cache.set(cache_key, body, ["catalog"])
+        return _json_response(body, etag)
     except Exception as e:
-        print(f"Error in featured products: {e}")
+        logger.error(f"Error in featured products: {e}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@router.get("/batch", response_model=ProductBatch)
+@run_in_session
+def get_products_batch(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated product ids"),
+    db: Session = Depends(get_read_db)
+):
+    """Get several products by id in one request (order preserved, unknown ids listed in `missing`)"""
+    return _batch_response(request, db, ids.split(","), conditional=True)
+
+@router.post("/batch", response_model=ProductBatch)
+@run_in_session
+def post_products_batch(request: Request, batch: ProductBatchRequest, db: Session = Depends(get_read_db)):
+    """Same as GET /batch, for id lists too long for a query string"""
+    return _batch_response(request, db, batch.ids)
+
+def _batch_response(request: Request, db: Session, ids: List[str], conditional: bool = False):
+    wanted = list(dict.fromkeys(i.strip() for i in ids if i and i.strip()))
+    if not wanted:
+        raise HTTPException(status_code=400, detail="No product ids given")
+    if len(wanted) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    
+    cache_key = catalog_key("batch", str(request.base_url), ids=",".join(wanted))
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not conditional:
+        # POST bodies are not conditional requests
+        etag, not_modified = None, None
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
+    try:
+        db_products, missing = _products_by_ids(db, wanted)
+        
+        products = [_product_dict(db_product, request) for db_product in db_products]
+        
+        body = dumps({"products": products, "missing": missing})
+        # Missing ids can appear on any create, so tag catalog-wide
+        catalog_cache.set(cache_key, body, ["catalog"])
+        return _json_response(body, etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: str, request: Request, db: Session = Depends(get_db)):
+@run_in_session
+def get_product(product_id: str, request: Request, db: Session = Depends(get_read_db)):
     """Get product by ID"""
+    cache_key = catalog_key("product", str(request.base_url), product_id=product_id)
+    version = _catalog_version(db)
+    etag, cache_key, not_modified = _check_not_modified(request, version, cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return _json_response(cached, etag)
+    
     try:
         # Find product by ID in database
         db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
@@ -384,48 +644,28 @@ async def get_product(product_id: str, request: Request, db: Session = Depends(g
         if not db_product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        product = Product(
-            id=db_product.id,
-            name=db_product.name,
-            description=db_product.description,
-            price=db_product.price,
-            currency="USD",
-            category=db_product.category,
-            image_url=_normalize_image_url(db_product.image_url, request),
-            stock=db_product.stock,
-            rating=db_product.rating,
-            review_count=0
-        )
+        product = _product_dict(db_product, request)
         
-        return product
+        body = dumps(product)
+        catalog_cache.set(cache_key, body, [f"product:{product_id}"])
+        return _json_response(body, etag)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/search/suggestions")
-async def get_search_suggestions(q: str = Query(..., min_length=1)):
+@run_in_session
+def get_search_suggestions(q: str = Query(..., min_length=1), db: Session = Depends(get_read_db)):
     """Get search suggestions based on query"""
     try:
         if len(q) < 2:
             return {"suggestions": []}
         
-        q_lower = q.lower()
-        suggestions = []
-        
-        # Get product name suggestions
-        for product in mock_products:
-            if q_lower in product["name"].lower():
-                suggestions.append(product["name"])
-        
-        # Get category suggestions
-        for category in mock_categories:
-            if q_lower in category["name"].lower():
-                suggestions.append(category["name"])
-        
-        # Remove duplicates and limit results
-        unique_suggestions = list(set(suggestions))[:5]
-        
-        return {"suggestions": unique_suggestions}
+        # Served from the in-process prefix index; the DB is only read if it was never built
+        suggestion_index.ensure_built(db)
+        return {"suggestions": suggestion_index.lookup(q, limit=5)}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
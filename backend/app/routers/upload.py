@@ -4,6 +4,9 @@ import os
 import uuid
 from datetime import datetime
 from app.routers.auth import verify_token
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -52,12 +55,12 @@ def upload_to_gcs(file_content: bytes, filename: str) -> str:
         # (individual blobs can be made public even when bucket-level prevention is on)
         try:
             blob.make_public()
-            print(f"✅ Blob made public: {blob.public_url}", flush=True)
+            logger.info(f"Blob made public: {blob.public_url}")
             return blob.public_url
         except Exception as public_error:
             # If making public fails (e.g., org policy), generate a signed URL instead
-            print(f"⚠️ Could not make blob public (may be restricted by org policy): {public_error}", flush=True)
-            print(f"ℹ️ Using signed URL instead (valid for 1 year)", flush=True)
+            logger.warning(f"Could not make blob public (may be restricted by org policy): {public_error}")
+            logger.info("Using signed URL instead (valid for 1 year)")
             
             # Generate signed URL that's valid for 1 year
             from datetime import timedelta
@@ -68,9 +71,7 @@ def upload_to_gcs(file_content: bytes, filename: str) -> str:
             return url
         
     except Exception as e:
-        print(f"❌ GCS upload failed: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"GCS upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to upload to cloud storage: {str(e)}")
 
 @router.post("/image")
@@ -105,32 +106,30 @@ async def upload_image(
         
         # Upload to GCS if configured, otherwise use local filesystem
         if USE_GCS:
-            print(f"📤 Uploading to GCS bucket: {GCS_BUCKET_NAME}", flush=True)
+            logger.info(f"Uploading to GCS bucket: {GCS_BUCKET_NAME}")
             try:
                 file_url = upload_to_gcs(file_content, unique_filename)
-                print(f"✅ Image uploaded to GCS successfully!", flush=True)
-                print(f"   URL: {file_url}", flush=True)
-                print(f"   Bucket: {GCS_BUCKET_NAME}", flush=True)
-                print(f"   Filename: {unique_filename}", flush=True)
+                logger.info(
+                    f"Image uploaded to GCS: {file_url}",
+                    extra={"bucket": GCS_BUCKET_NAME, "filename": unique_filename},
+                )
             except Exception as gcs_error:
-                print(f"❌ GCS upload failed: {gcs_error}", flush=True)
-                import traceback
-                traceback.print_exc()
-                print(f"⚠️ Falling back to local filesystem storage", flush=True)
+                logger.exception(f"GCS upload failed: {gcs_error}")
+                logger.warning("Falling back to local filesystem storage")
                 # Fallback to local storage
                 file_path = os.path.join(UPLOAD_DIR, unique_filename)
                 with open(file_path, "wb") as buffer:
                     buffer.write(file_content)
                 file_url = f"/uploads/{unique_filename}"
-                print(f"⚠️ Using local storage: {file_url}", flush=True)
+                logger.warning(f"Using local storage: {file_url}")
         else:
             # Local filesystem storage (for development)
-            print(f"ℹ️ GCS not configured (GCS_BUCKET_NAME not set), using local storage", flush=True)
+            logger.info("GCS not configured (GCS_BUCKET_NAME not set), using local storage")
             file_path = os.path.join(UPLOAD_DIR, unique_filename)
             with open(file_path, "wb") as buffer:
                 buffer.write(file_content)
             file_url = f"/uploads/{unique_filename}"
-            print(f"📁 Saved locally: {file_url}", flush=True)
+            logger.info(f"Saved locally: {file_url}")
         
         return JSONResponse(content={
             "message": "Image uploaded successfully",
@@ -143,9 +142,7 @@ async def upload_image(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Upload error: {e}", flush=True)
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Upload error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/image/{filename}")
@@ -0,0 +1,96 @@
+"""Product search backends.
+
+On PostgreSQL, products carry a generated `search_vector` tsvector column
+(name weighted above description) with a GIN index, and searches use
+`websearch_to_tsquery` with `ts_rank` for relevance. On other engines, or
+before the column has been created, search falls back to ILIKE.
+"""
+from sqlalchemy import func, literal_column, text
+from sqlalchemy.orm import Query
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for both the stored vector and the query
+TS_CONFIG = "english"
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_INDEX_NAME = "ix_products_search_vector"
+
+# Name matches rank above description matches
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B')"
+)
+
+# Cached per process: None = not checked yet
+_fulltext_available: Optional[bool] = None
+
+
+def ensure_search_schema(engine) -> bool:
+    """Create the generated tsvector column and GIN index on PostgreSQL.
+
+    The column is GENERATED ... STORED, so PostgreSQL keeps it in sync on
+    every insert/update without triggers. Safe to call repeatedly.
+    """
+    global _fulltext_available
+    if engine is None or engine.dialect.name != "postgresql":
+        _fulltext_available = False
+        return False
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE products ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} "
+                f"ON products USING GIN ({SEARCH_VECTOR_COLUMN})"
+            ))
+        _fulltext_available = True
+        logger.info("Full-text search column and index ready")
+    except Exception as e:
+        logger.warning(f"Could not create full-text search schema, using ILIKE search: {e}")
+        _fulltext_available = False
+    return _fulltext_available
+
+
+def fulltext_available(db) -> bool:
+    """Whether the products table has the search_vector column (checked once per process)"""
+    global _fulltext_available
+    if _fulltext_available is None:
+        bind = db.get_bind()
+        if bind.dialect.name != "postgresql":
+            _fulltext_available = False
+        else:
+            try:
+                found = db.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'products' AND column_name = :column"
+                ), {"column": SEARCH_VECTOR_COLUMN}).first()
+                _fulltext_available = found is not None
+            except Exception:
+                db.rollback()
+                _fulltext_available = False
+    return _fulltext_available
+
+
+def apply_search(query: Query, search: str, db, model) -> Tuple[Query, Optional[object]]:
+    """Filter `query` by `search` and return (query, rank expression).
+
+    The rank expression is None on the ILIKE fallback, where there is no
+    relevance score to sort by.
+    """
+    if fulltext_available(db):
+        ts_query = func.websearch_to_tsquery(TS_CONFIG, search)
+        vector = literal_column(f"products.{SEARCH_VECTOR_COLUMN}")
+        query = query.filter(vector.op("@@")(ts_query))
+        return query, func.ts_rank(vector, ts_query)
+
+    search_term = f"%{search}%"
+    query = query.filter(
+        model.name.ilike(search_term) |
+        model.description.ilike(search_term)
+    )
+    return query, None
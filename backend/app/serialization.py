@@ -0,0 +1,40 @@
+"""JSON encoding for hot list endpoints.
+
+List handlers turn ORM rows straight into plain dicts and encode them once
+with `dumps` (orjson when installed, the stdlib otherwise), instead of
+building Pydantic models per row and letting FastAPI validate and encode
+them again through `response_model`. The routes keep `response_model` so
+the OpenAPI schema is unchanged.
+
+`FastJSONResponse` is the app's default response class, so handlers that
+still return models or dicts get orjson encoding too.
+"""
+from typing import Any
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional - falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` to compact JSON bytes; datetimes become ISO 8601 strings"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,203 @@
+"""In-process typeahead index for /products/search/suggestions.
+
+Product names and category names are kept in a sorted array of lowercase
+keys, one key per word start ("wireless bluetooth headphones",
+"bluetooth headphones", "headphones"), so a prefix lookup is a bisect plus
+a scan of the matching range. Matches are ranked by rating.
+
+The index is built at warm-up (or by the first lookup, if that comes
+first) and updated incrementally by the admin product endpoints. Each
+process (each worker, each instance) holds its own copy, so
+`SuggestionRefresher` rebuilds it in a background thread when the catalog
+version changes (checked every SUGGESTION_CHECK_SECONDS) and at least every
+SUGGESTION_REFRESH_SECONDS, to pick up writes made through other processes;
+lookups never wait for that.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import threading
+import time
+
+# (key, display, kind, ref) - kind is "product" or "category", ref is the product id or category name
+Entry = Tuple[str, str, str, str]
+
+logger = logging.getLogger(__name__)
+
+
+def _keys_for(text: str) -> List[str]:
+    """Lowercase keys for every word start in `text`"""
+    words = text.lower().split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._entries: List[Entry] = []
+        self._products: Dict[str, Tuple[str, str, float]] = {}  # id -> (name, category, rating)
+        self._categories: Dict[str, Dict[str, float]] = {}  # category -> {product id: rating}
+        self._category_best: Dict[str, float] = {}  # category -> best product rating
+        self._built_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+
+    # Building
+
+    @property
+    def built(self) -> bool:
+        return self._built_at is not None
+
+    def rebuild(self, db):
+        """Load every product name, category and rating from the database"""
+        from app.models import Product as ProductModel
+
+        rows = db.query(ProductModel.id, ProductModel.name, ProductModel.category, ProductModel.rating).all()
+        with self._lock:
+            self._entries = []
+            self._products = {}
+            self._categories = {}
+            self._category_best = {}
+            for product_id, name, category, rating in rows:
+                self._add_product(product_id, name, category, rating)
+            self._entries.sort()
+            self._built_at = time.monotonic()
+
+    def ensure_built(self, db):
+        """Build the index if it has never been built; a built index is only refreshed in the background"""
+        if not self.built:
+            with self._build_lock:
+                if not self.built:
+                    self.rebuild(db)
+
+    # Incremental updates
+
+    def upsert_product(self, product_id: str, name: Optional[str], category: Optional[str], rating: Optional[float]):
+        with self._lock:
+            if self._built_at is None:
+                return  # Not built yet - warm-up or the first lookup will load it
+            self._remove_product(product_id)
+            self._add_product(product_id, name, category, rating, keep_sorted=True)
+
+    def remove_product(self, product_id: str):
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove_product(product_id)
+
+    def _add_product(self, product_id, name, category, rating, keep_sorted=False):
+        add = insort if keep_sorted else list.append
+        name = name or ""
+        category = category or ""
+        self._products[product_id] = (name, category, rating or 0.0)
+        for key in _keys_for(name):
+            add(self._entries, (key, name, "product", product_id))
+        if category:
+            members = self._categories.setdefault(category, {})
+            if not members:
+                for key in _keys_for(category):
+                    add(self._entries, (key, category, "category", category))
+            members[product_id] = rating or 0.0
+            self._category_best[category] = max(self._category_best.get(category, 0.0), rating or 0.0)
+
+    def _remove_product(self, product_id):
+        existing = self._products.pop(product_id, None)
+        if existing is None:
+            return
+        name, category, _ = existing
+        for key in _keys_for(name):
+            self._discard((key, name, "product", product_id))
+        if category:
+            members = self._categories.get(category, {})
+            members.pop(product_id, None)
+            if members:
+                self._category_best[category] = max(members.values())
+            else:
+                self._categories.pop(category, None)
+                self._category_best.pop(category, None)
+                for key in _keys_for(category):
+                    self._discard((key, category, "category", category))
+
+    def _discard(self, entry: Entry):
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    # Lookup
+
+    def _rating(self, entry: Entry) -> float:
+        _, _, kind, ref = entry
+        if kind == "product":
+            return self._products[ref][2]
+        # Categories rank by their best-rated product
+        return self._category_best.get(ref, 0.0)
+
+    def lookup(self, prefix: str, limit: int = 5) -> List[str]:
+        """Up to `limit` distinct names/categories with a word starting with `prefix`, best rated first"""
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect_left(self._entries, (prefix,))
+            best: Dict[str, float] = {}
+            for i in range(start, len(self._entries)):
+                entry = self._entries[i]
+                if not entry[0].startswith(prefix):
+                    break
+                rating = self._rating(entry)
+                if rating > best.get(entry[1], -1.0):
+                    best[entry[1]] = rating
+        return [display for display, _ in heapq.nsmallest(limit, best.items(), key=lambda item: (-item[1], item[0]))]
+
+
+class SuggestionRefresher:
+    """Background thread that keeps an index in step with the catalog.
+
+    Every `check_interval` seconds it reads the catalog version (memoized
+    by app.cache, so mostly free) and rebuilds when it changed, so writes
+    made through other workers or instances show up within seconds. It
+    also rebuilds every `interval` seconds regardless, for changes the
+    version does not capture (a rating edit that leaves updated_at alone).
+    """
+
+    def __init__(self, index: SuggestionIndex, session_factory, interval: float, check_interval: float = 5.0):
+        self.index = index
+        self.session_factory = session_factory
+        self.interval = interval
+        self.check_interval = check_interval if check_interval > 0 else interval
+        self._version: Optional[str] = None
+        self._rebuilt_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0 or self.session_factory is None:
+            return
+        self._thread = threading.Thread(target=self._run, name="suggestions-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        from app.cache import catalog_version
+
+        while not self._stop.wait(min(self.check_interval, self.interval)):
+            db = self.session_factory()
+            try:
+                version = catalog_version(db)
+                if self._version is None:
+                    self._version = version  # baseline; the index was built at warm-up or first lookup
+                due = time.monotonic() - self._rebuilt_at >= self.interval
+                if version != self._version or due:
+                    self.index.rebuild(db)
+                    self._version = version
+                    self._rebuilt_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Suggestion index refresh failed: {e}")
+            finally:
+                db.close()
+
+
+# Shared per-process index
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,210 @@
+"""Startup warm-up and readiness.
+
+`run_warmup` is started as a background task by the lifespan in app.main,
+so the server accepts connections (and answers /health) immediately while
+the expensive first-use work happens before real traffic needs it:
+
+- ``init_db``        create tables and sample data
+- ``sync_pool``      open WARMUP_CONNECTIONS connections on the sync engine
+- ``async_pool``     the same on the async engine (on the event loop,
+                     which owns its connections)
+- ``replicas``       one connection per read replica
+- ``crypto``         passlib's bcrypt backend (first hash loads it) and a
+                     JWT encode/decode round trip
+- ``catalog``        featured ranking (if not built yet), catalog version
+                     and the search suggestion index
+- ``catalog_cache``  GET requests for WARMUP_PATHS through the app itself,
+                     which fill the catalog response cache. Entries and
+                     image URLs are keyed by host, so this step only runs
+                     when WARMUP_BASE_URL (the public URL) is set. The
+                     requests are left out of the HTTP request metrics.
+
+/ready answers 503 until every step has run, or until WARMUP_TIMEOUT
+seconds have passed (a slow database should not keep an instance out of
+rotation forever). Each step's duration and error, if any, is in the /ready
+body and in the "Warm-up finished" log line. A failed step is logged and
+skipped; it never stops the server.
+"""
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[Dict[str, object]] = []
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def timed_out(self) -> bool:
+        return not self.finished and self.started_at is not None and time.monotonic() - self.started_at > self.timeout
+
+    @property
+    def ready(self) -> bool:
+        return self.finished or self.timed_out
+
+    def report(self) -> Dict[str, object]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "finished": self.finished,
+            "timed_out": self.timed_out,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "steps": list(self.steps),
+        }
+
+
+warmup_state = WarmupState(timeout=settings.warmup_timeout)
+
+
+async def _step(name: str, work):
+    """Run one step (a coroutine function), recording its duration and any error"""
+    start = time.perf_counter()
+    entry: Dict[str, object] = {"name": name}
+    try:
+        detail = await work()
+        if detail is not None:
+            entry["detail"] = detail
+    except Exception as e:
+        entry["error"] = str(e)[:200]
+        logger.warning(f"Warm-up step '{name}' failed: {e}")
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    warmup_state.steps.append(entry)
+
+
+def _init_db():
+    from app.database import init_db
+    init_db()
+
+
+def _fill_sync_pool(connections: int) -> int:
+    from sqlalchemy import text
+    from app.database import engine
+
+    if engine is None:
+        return 0
+    opened = [engine.connect() for _ in range(connections)]
+    try:
+        for connection in opened:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()  # back to the pool, still open
+    return len(opened)
+
+
+async def _fill_async_pool(connections: int) -> int:
+    from sqlalchemy import text
+    from app.database import async_engine
+
+    if async_engine is None:
+        return 0
+
+    async def ping():
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*[ping() for _ in range(connections)])
+    return connections
+
+
+async def _touch_replicas() -> int:
+    from sqlalchemy import text
+    from app.database import open_session
+    from app.replicas import replica_set
+
+    for replica in replica_set.replicas:
+        db = open_session(replica.async_factory, replica.sync_factory)
+        try:
+            await db.run_sync(lambda session: session.execute(text("SELECT 1")))
+        finally:
+            await db.close()
+    return len(replica_set.replicas)
+
+
+def _warm_crypto():
+    import jwt
+    from app.config import JWT_CONFIG
+    from app.routers.auth import create_access_token, pwd_context
+
+    pwd_context.hash("warm-up")
+    token = create_access_token({"sub": "warm-up"})
+    jwt.decode(token, JWT_CONFIG["secret_key"], algorithms=[JWT_CONFIG["algorithm"]])
+
+
+def _warm_catalog_state():
+    from app.cache import catalog_version
+    from app.database import SessionLocal
+    from app.featured import ranking_computed, refresh_featured
+    from app.suggestions import suggestion_index
+
+    if SessionLocal is None:
+        return
+    db = SessionLocal()
+    try:
+        # Build the featured ranking now: building it changes the catalog
+        # version, which would orphan anything cached before it
+        if not ranking_computed(db):
+            refresh_featured(db)
+        catalog_version(db)
+        suggestion_index.rebuild(db)
+    finally:
+        db.close()
+
+
+async def _prime_catalog_cache(app):
+    import httpx
+    from app.metrics import untracked
+
+    if not settings.warmup_base_url:
+        # Entries cached for any other host would never be hit
+        return "skipped: WARMUP_BASE_URL not set"
+    paths = [path.strip() for path in settings.warmup_paths.split(",") if path.strip()]
+    statuses = {}
+    transport = httpx.ASGITransport(app=app)
+    with untracked():
+        async with httpx.AsyncClient(transport=transport, base_url=settings.warmup_base_url) as client:
+            for path in paths:
+                response = await client.get(path, headers={"accept-encoding": "identity"})
+                statuses[path] = response.status_code
+    return statuses
+
+
+async def run_warmup(app):
+    """Run every warm-up step in order; marks `warmup_state` finished at the end"""
+    warmup_state.start()
+    connections = max(0, min(settings.warmup_connections, settings.db_pool_size))
+    logger.info("Warm-up started")
+
+    await _step("init_db", lambda: run_in_threadpool(_init_db))
+    await _step("sync_pool", lambda: run_in_threadpool(_fill_sync_pool, connections))
+    await _step("async_pool", lambda: _fill_async_pool(connections))
+    await _step("replicas", _touch_replicas)
+    await _step("crypto", lambda: run_in_threadpool(_warm_crypto))
+    await _step("catalog", lambda: run_in_threadpool(_warm_catalog_state))
+    await _step("catalog_cache", lambda: _prime_catalog_cache(app))
+
+    warmup_state.finished_at = time.monotonic()
+    report = warmup_state.report()
+    logger.info(
+        f"Warm-up finished in {report['elapsed_seconds']}s: "
+        + ", ".join(f"{step['name']} {step['seconds']}s" + (" (failed)" if "error" in step else "") for step in report["steps"]),
+        extra={"warmup": report},
+    )
@@ -0,0 +1,256 @@
+"""Multi-process serving for start.py: a supervisor and forked uvicorn workers.
+
+`WorkerPool.run()` is used when WEB_CONCURRENCY resolves to more than one
+worker. The supervisor (the process start.py runs in):
+
+- has already imported app.main (preload), so workers are forked with the
+  app, routers and settings in memory and start in milliseconds
+- runs init_db once before forking and closes the connections it used;
+  workers inherit ``database.db_initialized`` and skip it, so N workers
+  never race to create tables and sample data
+- binds the listening socket once; every worker accepts on it
+- starts a replacement whenever a worker exits: after MAX_REQUESTS (plus
+  a random 0..MAX_REQUESTS_JITTER, so workers do not all recycle at once)
+  or after a crash. A worker that keeps crashing right after it starts is
+  restarted with an increasing delay (up to 30 s)
+- on SIGTERM/SIGINT sends SIGTERM to every worker, which stops accepting
+  and gives in-flight requests GRACEFUL_TIMEOUT seconds, then kills any
+  worker still running
+
+Each worker is a separate process with its own lifespan (warm-up, pools,
+caches, featured and suggestion refresh) and its own /metrics counters.
+In-memory caches and the suggestion index are per worker: an admin write
+updates the worker that handled it, and the others catch up when their
+catalog version memo expires (CATALOG_VERSION_TTL) and their suggestion
+refresher next checks (SUGGESTION_CHECK_SECONDS). With CACHE_BACKEND=redis
+the response cache is shared.
+
+Every worker also has its own connection pools, so the most connections
+an instance can open is ``max_db_connections(workers)``; it is logged at
+start, and start.py defaults to a single process (WEB_CONCURRENCY=1).
+"""
+from typing import Dict, Optional
+import logging
+import os
+import random
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+# A worker that exits within this many seconds of starting counts as a failed start
+MIN_UPTIME = 5.0
+MAX_RESTART_DELAY = 30.0
+
+
+def cpu_count() -> int:
+    """CPUs this process may use: affinity mask, capped by a cgroup v2 CPU quota"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+def resolve_workers(configured: int) -> int:
+    return configured if configured > 0 else cpu_count()
+
+
+def max_db_connections(workers: int) -> int:
+    """Most database connections `workers` processes can hold: two primary
+    engines (sync and async) and one per replica, each pool_size + max_overflow"""
+    from app.config import settings
+
+    replicas = len([url for url in settings.database_replica_urls.split(",") if url.strip()])
+    return workers * (2 + replicas) * (settings.db_pool_size + settings.db_max_overflow)
+
+
+class _Worker:
+    def __init__(self, slot: int, pid: int, max_requests: Optional[int]):
+        self.slot = slot
+        self.pid = pid
+        self.max_requests = max_requests
+        self.started_at = time.monotonic()
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        app,
+        host: str,
+        port: int,
+        workers: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.running: Dict[int, _Worker] = {}
+        # slot -> monotonic time its replacement may start
+        self.pending: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.stopping = False
+        self.sock: Optional[socket.socket] = None
+
+    def run(self) -> int:
+        """Serve until SIGTERM/SIGINT; returns the process exit code"""
+        self.preload()
+        self.sock = self.bind()
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        connections = max_db_connections(self.workers)
+        logger.info(
+            f"Supervisor {os.getpid()} starting {self.workers} workers on {self.host}:{self.port} "
+            f"(up to {connections} database connections)",
+            extra={
+                "workers": self.workers, "max_requests": self.max_requests,
+                "graceful_timeout": self.graceful_timeout, "max_db_connections": connections,
+            },
+        )
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while not self.stopping:
+            self.reap()
+            now = time.monotonic()
+            for slot, start_at in list(self.pending.items()):
+                if start_at <= now and not self.stopping:
+                    del self.pending[slot]
+                    self.spawn(slot)
+            time.sleep(0.2)
+
+        self.shutdown()
+        return 0
+
+    def preload(self):
+        """Work done once in the supervisor so workers inherit it"""
+        from app import database
+
+        database.init_db()
+        # Connections must not be shared across fork; workers open their own
+        if database.engine is not None:
+            database.engine.dispose()
+
+    def bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def spawn(self, slot: int):
+        from app.logging_config import pause_logging, resume_logging
+
+        max_requests = None
+        if self.max_requests > 0:
+            max_requests = self.max_requests + random.randint(0, max(0, self.max_requests_jitter))
+        # The log writer thread must not be mid-write (holding stdout's lock) at fork
+        pause_logging()
+        pid = os.fork()
+        # Parent and child each start their own writer
+        resume_logging()
+        if pid == 0:
+            code = 1
+            try:
+                # A worker that never finished startup counts as a crash
+                code = 0 if self.serve_worker(max_requests) else 3
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} failed")
+            finally:
+                from app.logging_config import shutdown_logging
+                shutdown_logging()
+                # Skip the supervisor's atexit handlers and cleanup
+                os._exit(code)
+        self.running[pid] = _Worker(slot, pid, max_requests)
+        logger.info(f"Worker {pid} started (slot {slot}, max requests {max_requests or 'unlimited'})")
+
+    def serve_worker(self, max_requests: Optional[int]) -> bool:
+        """Run uvicorn on the shared socket; returns whether it started"""
+        import uvicorn
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Otherwise every worker continues the supervisor's random sequence
+        random.seed()
+
+        config = uvicorn.Config(
+            self.app,
+            log_config=None,
+            access_log=True,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        server = uvicorn.Server(config)
+        server.run(sockets=[self.sock])
+        return server.started
+
+    def reap(self):
+        """Collect exited workers and schedule their replacements"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.running.pop(pid, None)
+            if worker is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            uptime = time.monotonic() - worker.started_at
+            if self.stopping:
+                continue
+            if code == 0:
+                self.failures[worker.slot] = 0
+                logger.info(f"Worker {pid} exited after {uptime:.0f}s (recycled), starting a replacement")
+                self.pending[worker.slot] = time.monotonic()
+                continue
+            failures = (self.failures.get(worker.slot, 0) + 1) if uptime < MIN_UPTIME else 1
+            self.failures[worker.slot] = failures
+            # First crash: restart now; repeated failed starts: 1, 2, 4 ... seconds
+            delay = min(MAX_RESTART_DELAY, 2 ** (failures - 2)) if failures > 1 else 0
+            logger.error(f"Worker {pid} crashed with exit code {code} after {uptime:.1f}s, restarting in {delay:g}s")
+            self.pending[worker.slot] = time.monotonic() + delay
+
+    def shutdown(self):
+        logger.info(f"Supervisor stopping {len(self.running)} workers (graceful timeout {self.graceful_timeout:g}s)")
+        for pid in list(self.running):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # uvicorn enforces the timeout itself; the margin covers the lifespan shutdown
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.running and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.running):
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.running.clear()
+        if self.sock is not None:
+            self.sock.close()
+        logger.info("Supervisor stopped")
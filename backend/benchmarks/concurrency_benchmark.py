@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Measure API throughput and latency under concurrent clients.
+
+Runs a fixed number of concurrent clients (default 50 and 200) against a
+running backend, each issuing requests back to back for `--duration`
+seconds, and reports requests/sec and latency percentiles per level.
+
+Start one worker with the response cache off, so every request reaches the
+database:
+
+    CATALOG_CACHE_TTL=0 uvicorn app.main:app --port 8000 --workers 1
+    python benchmarks/concurrency_benchmark.py --url http://localhost:8000 \\
+        --path "/api/v1/products/?limit=20" --clients 50 200
+
+To compare, run the same command against a build whose handlers use the
+sync `get_db` session, and then against the async `get_async_db` handlers.
+A slow query only blocks the event loop in the sync build, so p99 latency
+diverges as the number of clients grows.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def client_loop(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_level(url: str, path: str, clients: int, duration: float, warmup: float):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        if warmup > 0:
+            await asyncio.gather(*[client_loop(client, path, time.perf_counter() + warmup, [], []) for _ in range(clients)])
+
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[client_loop(client, path, deadline, latencies, errors) for _ in range(clients)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(
+        f"{clients:>5} clients: {len(latencies) / elapsed:>9,.1f} req/s  "
+        f"p50 {pct(0.50):>7.1f} ms  p95 {pct(0.95):>7.1f} ms  p99 {pct(0.99):>7.1f} ms  "
+        f"mean {statistics.fmean(latencies) * 1000:>7.1f} ms  errors {len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="backend base URL")
+    parser.add_argument("--path", default="/api/v1/products/?limit=20", help="request path")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200], help="concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="warm-up seconds per level")
+    args = parser.parse_args()
+
+    print(f"GET {args.url}{args.path} for {args.duration:g}s per level")
+    for clients in args.clients:
+        asyncio.run(run_level(args.url, args.path, clients, args.duration, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Compare middleware stacks on GET /health, in process.
+
+Builds the same FastAPI app three times:
+
+- ``none``           no middleware
+- ``base_http``      the old HTTPSRedirectMiddleware (a BaseHTTPMiddleware
+                     that rewrote scope["scheme"] from X-Forwarded-Proto)
+- ``proxy_headers``  app.proxy_headers.ProxyHeadersMiddleware (plain ASGI)
+
+and calls each one directly through the ASGI interface (no sockets, no
+server), `--concurrency` requests at a time, so the numbers are the
+middleware and framework overhead alone.
+
+    python benchmarks/middleware_benchmark.py --requests 20000 --concurrency 1 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.proxy_headers import ProxyHeadersMiddleware
+
+
+class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
+    """The middleware app/main.py used before ProxyHeadersMiddleware"""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.headers.get("X-Forwarded-Proto") == "https":
+            request.scope["scheme"] = "https"
+        elif request.url.scheme == "http" and "X-Forwarded-Proto" in request.headers:
+            proto = request.headers.get("X-Forwarded-Proto", "https")
+            request.scope["scheme"] = proto
+
+        response = await call_next(request)
+        return response
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "service": "ecommerce-store-backend", "version": "1.0.0"}
+
+    if stack == "base_http":
+        app.add_middleware(HTTPSRedirectMiddleware)
+    elif stack == "proxy_headers":
+        app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+    return app
+
+
+def make_scope():
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"ecommerce-backend.example.com"),
+            (b"x-forwarded-proto", b"https"),
+            (b"x-forwarded-for", b"203.0.113.7, 10.0.0.2"),
+        ],
+        "client": ("10.0.0.2", 51234),
+        "server": ("127.0.0.1", 8080),
+    }
+
+
+async def call(app):
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(make_scope(), receive, send)
+    assert status == 200, status
+
+
+async def run(app, requests: int, concurrency: int) -> float:
+    # Warm up (lifespan is not needed for /health)
+    for _ in range(100):
+        await call(app)
+
+    async def worker(count: int):
+        for _ in range(count):
+            await call(app)
+
+    per_worker = requests // concurrency
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(per_worker) for _ in range(concurrency)])
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="requests per stack and level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50], help="in-flight requests")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        print(f"GET /health, {args.requests} requests, concurrency {concurrency}")
+        baseline = None
+        for stack in ("none", "base_http", "proxy_headers"):
+            rate = asyncio.run(run(build_app(stack), args.requests, concurrency))
+            baseline = baseline or rate
+            print(f"  {stack:<14} {rate:>10,.0f} req/s  {rate / baseline:>6.1%} of no middleware")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Compare product-list serialization paths for one page of rows.
+
+Times three ways of turning a page of `Product` ORM rows into response bytes:
+
+- ``response_model``  per-row Pydantic models wrapped in ProductList, then
+                       validated and encoded again the way FastAPI does for a
+                       returned model (the original get_products path)
+- ``model_dump_json`` per-row Pydantic models encoded once by Pydantic
+- ``direct``          rows to plain dicts encoded with app.serialization.dumps
+                       (orjson when installed)
+
+No database is needed; rows are transient ORM objects.
+
+    python benchmarks/serialization_benchmark.py --rows 100 --iterations 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import Product as ProductModel
+from app.routers.products import Product, ProductList, _product_dict, _normalize_image_url
+from app.serialization import dumps, orjson
+
+
+class BenchRequest:
+    """Just enough of a Request for image URL resolution"""
+    base_url = "http://localhost:8000/"
+
+
+def make_rows(count: int):
+    return [
+        ProductModel(
+            id=f"bench_{i}",
+            name=f"Wireless Bluetooth Headphones {i}",
+            description="High-quality wireless headphones with noise cancellation. " * 4,
+            price=99.99 + i,
+            category="Electronics",
+            image_url=f"/uploads/bench_{i % 20}.jpg",
+            stock=50,
+            rating=4.5,
+        )
+        for i in range(count)
+    ]
+
+
+def _models(rows, request):
+    return [
+        Product(
+            id=row.id,
+            name=row.name,
+            description=row.description,
+            price=row.price,
+            currency="USD",
+            category=row.category,
+            image_url=_normalize_image_url(row.image_url, request),
+            stock=row.stock,
+            rating=row.rating,
+            review_count=0,
+        )
+        for row in rows
+    ]
+
+
+def _page(products):
+    return dict(products=products, total=1000, total_exact=True, total_label=None, page=1,
+                limit=len(products), has_next=True, has_prev=False, next_cursor=None)
+
+
+def via_response_model(rows, request) -> bytes:
+    listing = ProductList(**_page(_models(rows, request)))
+    # FastAPI: validate the returned value against response_model, jsonable_encoder, json.dumps
+    validated = ProductList.model_validate(listing.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def via_model_dump_json(rows, request) -> bytes:
+    return ProductList(**_page(_models(rows, request))).model_dump_json().encode("utf-8")
+
+
+def via_direct(rows, request) -> bytes:
+    return dumps(_page([_product_dict(row, request) for row in rows]))
+
+
+def time_path(fn, rows, request, iterations: int) -> float:
+    fn(rows, request)  # warm-up (image URL memo, Pydantic schema build)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(rows, request)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--iterations", type=int, default=2000, help="pages serialized per path")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    request = BenchRequest()
+    assert json.loads(via_direct(rows, request)) == json.loads(via_model_dump_json(rows, request))
+
+    print(f"{args.rows} rows/page, {args.iterations} pages, encoder: {'orjson' if orjson else 'json'}")
+    baseline = None
+    for name, fn in (("response_model", via_response_model), ("model_dump_json", via_model_dump_json), ("direct", via_direct)):
+        elapsed = time_path(fn, rows, request, args.iterations)
+        rows_per_sec = args.rows * args.iterations / elapsed
+        baseline = baseline or rows_per_sec
+        print(f"{name:>16}: {rows_per_sec:>12,.0f} rows/s  {elapsed / args.iterations * 1e6:>8.1f} us/page  {rows_per_sec / baseline:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
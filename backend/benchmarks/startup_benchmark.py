@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Measure cold-start cost: importing app.main and serving the first request.
+
+Each run is a fresh interpreter (nothing cached in sys.modules):
+
+- ``import``         ``python -X importtime -c "import app.main"``; the
+                     cumulative time of app.main and the slowest modules
+                     it pulls in, from the importtime report on stderr
+- ``first request``  imports app.main and times one request to `--path`
+                     through the ASGI interface (no sockets, no lifespan),
+                     as the first request after a cold start would see it
+
+Runs use WARMUP_ENABLED=false and the environment of the caller, so point
+DATABASE_URL at a scratch database (or leave it unset) if `--path` reads
+from it. `--json` prints one object for tracking regressions over time.
+
+    python benchmarks/startup_benchmark.py --runs 5 --top 15
+    python benchmarks/startup_benchmark.py --path /api/products --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+status = None
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    global status
+    if message["type"] == "http.response.start":
+        status = message["status"]
+
+path, _, query = sys.argv[1].partition("?")
+scope = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+    "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+    "root_path": "", "query_string": query.encode(),
+    "headers": [(b"host", b"localhost")],
+    "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8080),
+}
+asyncio.run(app(scope, receive, send))
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "request": done - imported, "status": status}))
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault("WARMUP_ENABLED", "false")
+    return env
+
+
+def parse_importtime(stderr: str):
+    """{module: (self_us, cumulative_us)} from an -X importtime report"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def measure_import():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import app.main failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure_first_request(path: str):
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST, path],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"first request failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list (by cumulative time)")
+    parser.add_argument("--path", default="/health", help="path for the first request")
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of a report")
+    args = parser.parse_args()
+
+    import_runs = [measure_import() for _ in range(args.runs)]
+    app_main_ms = [modules["app.main"][1] / 1000 for modules in import_runs]
+    # Median cumulative time per module across runs
+    names = set().union(*import_runs)
+    slowest = sorted(
+        ((name, statistics.median(modules.get(name, (0, 0))[1] for modules in import_runs) / 1000) for name in names),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    slowest = [(name, ms) for name, ms in slowest if name != "app.main"][: args.top]
+
+    request_runs = [measure_first_request(args.path) for _ in range(args.runs)]
+    statuses = sorted({run["status"] for run in request_runs})
+
+    summary = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_app_main_ms": {
+            "median": round(statistics.median(app_main_ms), 1),
+            "min": round(min(app_main_ms), 1),
+            "max": round(max(app_main_ms), 1),
+        },
+        "first_request": {
+            "path": args.path,
+            "status": statuses,
+            "import_ms": round(statistics.median(run["import"] * 1000 for run in request_runs), 1),
+            "request_ms": round(statistics.median(run["request"] * 1000 for run in request_runs), 1),
+        },
+        "slowest_imports_ms": {name: round(ms, 1) for name, ms in slowest},
+        "lazy_not_imported": sorted(
+            name for name in ("jwt", "passlib", "bcrypt", "google.cloud.storage", "uvicorn")
+            if all(name not in modules for modules in import_runs)
+        ),
+    }
+
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    imp = summary["import_app_main_ms"]
+    first = summary["first_request"]
+    print(f"import app.main, {args.runs} runs: median {imp['median']} ms (min {imp['min']}, max {imp['max']})")
+    print(f"first GET {first['path']} (status {first['status']}): {first['request_ms']} ms after an import of {first['import_ms']} ms")
+    print("slowest imports under app.main (cumulative, median):")
+    for name, ms in summary["slowest_imports_ms"].items():
+        print(f"  {name:<40} {ms:>8.1f} ms")
+    print(f"not imported at startup: {', '.join(summary['lazy_not_imported']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Compare throughput with 1, 2 and 4 worker processes (start.py, WEB_CONCURRENCY).
+
+For each worker count the benchmark starts its own server with
+`--command` (default ``python start.py``), waits for /ready, runs every
+scenario with `--clients` concurrent clients for `--duration` seconds,
+then stops the server with SIGTERM (the graceful path the supervisor
+takes on Cloud Run):
+
+- ``login``     POST /api/v1/auth/login as the sample customer; bcrypt
+                verification is CPU-bound, so it scales with processes
+- ``products``  GET /api/v1/products/?limit=20 with the response cache
+                off (CATALOG_CACHE_TTL=0 is set for the server)
+- ``health``    GET /health, framework overhead only
+
+The server inherits this environment, so set DATABASE_URL to a database
+with the sample data (init_db creates it on first start). The client is
+a single asyncio process; for the cheap scenarios at 4 workers it can
+become the bottleneck, so compare the login numbers first.
+
+    python benchmarks/worker_benchmark.py --workers 1 2 4 --clients 32 --duration 15
+    python benchmarks/worker_benchmark.py --scenarios products --clients 64 128
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "login": ("POST", "/api/v1/auth/login", {"email": "test@example.com", "password": "password"}),
+    "products": ("GET", "/api/v1/products/?limit=20", None),
+    "health": ("GET", "/health", None),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(command: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({"PORT": str(port), "WEB_CONCURRENCY": str(workers), "MAX_REQUESTS": "0", "CATALOG_CACHE_TTL": "0"})
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return subprocess.Popen(command, shell=True, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server exited with code {process.returncode} before it was ready")
+        try:
+            if httpx.get(f"{url}/ready", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"server not ready after {timeout:g}s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def client_loop(client: httpx.AsyncClient, scenario: str, deadline: float, latencies: list, errors: list):
+    method, path, body = SCENARIOS[scenario]
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_scenario(url: str, scenario: str, clients: int, duration: float, warmup: float):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        if warmup > 0:
+            await asyncio.gather(*[client_loop(client, scenario, time.perf_counter() + warmup, [], []) for _ in range(clients)])
+
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[client_loop(client, scenario, deadline, latencies, errors) for _ in range(clients)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return len(latencies) / elapsed, pct(0.50), pct(0.99), len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--scenarios", nargs="+", default=["login", "products"], choices=sorted(SCENARIOS))
+    parser.add_argument("--clients", type=int, nargs="+", default=[32], help="concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="warm-up seconds per scenario and level")
+    parser.add_argument("--command", default=f"{sys.executable} start.py", help="server command, run from backend/")
+    args = parser.parse_args()
+
+    results = {}
+    for workers in args.workers:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = start_server(args.command, workers, port)
+        try:
+            wait_ready(url, process)
+            for scenario in args.scenarios:
+                for clients in args.clients:
+                    results[(scenario, clients, workers)] = asyncio.run(
+                        run_scenario(url, scenario, clients, args.duration, args.warmup)
+                    )
+        finally:
+            stop_server(process)
+
+    for scenario in args.scenarios:
+        for clients in args.clients:
+            method, path, _ = SCENARIOS[scenario]
+            print(f"{scenario}: {method} {path}, {clients} clients, {args.duration:g}s")
+            baseline = None
+            for workers in args.workers:
+                rate, p50, p99, errors = results[(scenario, clients, workers)]
+                baseline = baseline or rate
+                print(
+                    f"  {workers:>2} workers {rate:>9,.1f} req/s  {rate / baseline:>5.2f}x  "
+                    f"p50 {p50:>7.1f} ms  p99 {p99:>7.1f} ms  errors {errors}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,100 @@
 #!/usr/bin/env python3
-"""Startup script for Cloud Run - ensures PORT is read correctly"""
+"""Startup script for Cloud Run - ensures PORT is read correctly.
+
+The app is imported exactly once, here, and the app object itself is
+handed to uvicorn (not the "app.main:app" string, which made uvicorn
+import it a second time). Importing app.main sets up structured logging,
+so uvicorn's own logging config is turned off and its records go through
+the same JSON handler.
+
+With WEB_CONCURRENCY above 1 (or 0, one per CPU) this process becomes a
+supervisor that forks that many workers from the already-imported app;
+see app/workers.py. The default, 1, is a single process.
+"""
 import os
 import sys
+import time
 
 # Get port from environment variable
 port = int(os.getenv("PORT", "8080"))
 
-print(f"🚀 Starting server on port {port}", flush=True)
-print(f"📦 Python: {sys.version}", flush=True)
-print(f"📁 Working directory: {os.getcwd()}", flush=True)
-print(f"📋 Python path: {sys.path}", flush=True)
-print(f"🌐 PORT environment variable: {os.getenv('PORT', 'not set')}", flush=True)
+print(f"🚀 Starting server on port {port} (Python {sys.version.split()[0]}, cwd {os.getcwd()})", flush=True)
+
+
+def load_app():
+    """Import app.main, or build a minimal app that reports the import error"""
+    try:
+        start = time.perf_counter()
+        from app.main import app
+        import logging
+        logging.getLogger("start").info(f"app.main imported in {time.perf_counter() - start:.2f}s")
+        return app
+    except Exception as e:
+        print(f"❌ CRITICAL: Failed to import app.main: {e}", flush=True)
+        import traceback
+        traceback.print_exc()
+        print("FALLBACK: Starting minimal server to debug...", flush=True)
+
+        # Fallback to minimal app
+        from fastapi import FastAPI
+        app = FastAPI()
+        error = str(e)
+        @app.get("/")
+        async def root():
+            return {"status": "error", "message": f"App import failed: {error}"}
+        @app.get("/health")
+        async def health():
+            return {"status": "degraded", "error": error}
+        return app
+
+
+def main():
+    try:
+        import uvicorn
+    except Exception as e:
+        print(f"❌ CRITICAL: Cannot import uvicorn: {e}", flush=True)
+        sys.exit(1)
+
+    app = load_app()
+    workers = 1
+    try:
+        from app.config import settings
+        from app.workers import WorkerPool, resolve_workers
+        workers = resolve_workers(settings.web_concurrency)
+        if workers > 1 and not hasattr(os, "fork"):
+            print("⚠️ WEB_CONCURRENCY > 1 needs os.fork; running a single process", flush=True)
+            workers = 1
+    except Exception as e:
+        print(f"⚠️ Worker settings unavailable, running a single process: {e}", flush=True)
 
-# CRITICAL: Import uvicorn first - it's the most reliable
-try:
-    print("🔍 Step 1: Importing uvicorn...", flush=True)
-    import uvicorn
-    print("✅ uvicorn imported", flush=True)
-except Exception as e:
-    print(f"❌ CRITICAL: Cannot import uvicorn: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
+    if workers > 1:
+        pool = WorkerPool(
+            app,
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            max_requests=settings.max_requests,
+            max_requests_jitter=settings.max_requests_jitter,
+            graceful_timeout=settings.graceful_timeout,
+        )
+        sys.exit(pool.run())
 
-# Try importing the app module with detailed error reporting
-try:
-    print("🔍 Step 2: Importing app.main...", flush=True)
-    from app import main
-    print("✅ app.main imported successfully", flush=True)
-    print(f"✅ App object type: {type(main.app)}", flush=True)
-    print(f"✅ App object: {main.app}", flush=True)
-except Exception as e:
-    print(f"❌ CRITICAL: Failed to import app.main: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    print("\n" + "="*80, flush=True)
-    print("FALLBACK: Starting minimal server to debug...", flush=True)
-    print("="*80 + "\n", flush=True)
-    
-    # Fallback to minimal app
-    from fastapi import FastAPI
-    app = FastAPI()
-    @app.get("/")
-    async def root():
-        return {"status": "error", "message": f"App import failed: {str(e)}"}
-    @app.get("/health")
-    async def health():
-        return {"status": "degraded", "error": str(e)}
-    
-    print("✅ Fallback app created, starting server...", flush=True)
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
-    sys.exit(0)
+    try:
+        uvicorn.run(
+            app,
+            host="0.0.0.0",
+            port=port,
+            log_config=None,
+            access_log=True
+        )
+    except KeyboardInterrupt:
+        print("🛑 Server stopped by user", flush=True)
+    except Exception as e:
+        print(f"❌ CRITICAL: Fatal error starting server: {e}", flush=True)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
-# All good - start the real app
-try:
-    print("✅ Step 3: All imports successful, starting server...", flush=True)
-    print(f"🌐 Server will listen on 0.0.0.0:{port}", flush=True)
-    
-    # Start server - use string reference to avoid import issues
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=port,
-        log_level="info",
-        access_log=True
-    )
-except KeyboardInterrupt:
-    print("🛑 Server stopped by user", flush=True)
-    sys.exit(0)
-except Exception as e:
-    print(f"❌ CRITICAL: Fatal error starting server: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Shared fixtures: the app on a throwaway SQLite database, auth headers,
+an empty in-memory database (`scratch_db`) and `budget`, which fails a test when a block runs too many SQL statements
+(app.querycount)."""
+import os
+import tempfile
+
+import pytest
+
+# Must be set before app.config is imported
+_db_dir = tempfile.mkdtemp(prefix="ecommerce-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("DATABASE_REPLICA_URLS", "")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+os.environ.setdefault("CATALOG_CACHE_TTL", "0")
+os.environ.setdefault("CATALOG_VERSION_TTL", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import init_db
+from app.main import app
+from app.models import Base
+from app.querycount import query_budget
+from app.routers.auth import create_access_token
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Sample products and users (admin_1, user_1)
+    init_db()
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def admin_headers():
+    return {"Authorization": "Bearer " + create_access_token({"sub": "admin_1"})}
+
+
+@pytest.fixture(scope="session")
+def user_headers():
+    return {"Authorization": "Bearer " + create_access_token({"sub": "user_1"})}
+
+
+@pytest.fixture
+def anyio_backend():
+    # SQLAlchemy's async sessions and greenlet bridge run on asyncio
+    return "asyncio"
+
+
+@pytest.fixture
+def budget():
+    """``with budget(n): ...`` fails when the block runs more than n statements
+    (or, with max_repeats, repeats one statement shape more often)"""
+    return query_budget
+
+
+@pytest.fixture
+def scratch_db():
+    """Session on an empty in-memory SQLite database with every table"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
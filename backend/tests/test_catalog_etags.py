@@ -0,0 +1,20 @@
+"""Conditional requests on the catalog endpoints."""
+from app.routers import products as products_router
+
+
+def test_listing_etag_round_trip(client):
+    response = client.get("/api/v1/products/?limit=2")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert client.get("/api/v1/products/?limit=2", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_listing_served_without_catalog_version(client, monkeypatch):
+    def unavailable(db):
+        raise RuntimeError("version query failed")
+
+    monkeypatch.setattr(products_router, "catalog_version", unavailable)
+    response = client.get("/api/v1/products/?limit=2&count_mode=exact")
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert len(response.json()["products"]) == 2
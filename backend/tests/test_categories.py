@@ -0,0 +1,29 @@
+"""Category counts maintained by the admin product writes."""
+from app.categories import adjust_category_counts, list_categories
+from app.database import upsert
+from app.models import Category, Product
+
+
+def _counts(db):
+    return {category.name: category.product_count for category in db.query(Category).all()}
+
+
+def test_counts_follow_product_moves(scratch_db):
+    db = scratch_db
+    db.add(Product(id="p1", name="Lamp", price=10.0, category="Home", stock=1))
+    db.commit()
+    assert [category.name for category in list_categories(db)] == ["Home"]
+
+    adjust_category_counts(db, None, "Garden")
+    adjust_category_counts(db, "Home", "Garden")
+    db.commit()
+    assert _counts(db) == {"Home": 0, "Garden": 2}
+    assert [category.name for category in list_categories(db)] == ["Garden"]
+
+
+def test_upsert_updates_existing_row(scratch_db):
+    db = scratch_db
+    for _ in range(2):
+        upsert(db, Category, {"name": "Toys", "product_count": 1}, ["name"], {"product_count": Category.product_count + 1})
+    db.commit()
+    assert _counts(db) == {"Toys": 2}
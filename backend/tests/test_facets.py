@@ -0,0 +1,50 @@
+"""The precomputed facets table answers exactly like the live query."""
+import pytest
+
+from app import facets
+from app.config import settings
+from app.models import Product
+
+
+def _live_and_precomputed(db, monkeypatch, **filters):
+    monkeypatch.setattr(settings, "facets_precomputed", False)
+    live = facets.compute_facets(db, **filters)
+    monkeypatch.setattr(settings, "facets_precomputed", True)
+    precomputed = facets.compute_facets(db, **filters)
+    assert (live["source"], precomputed["source"]) == ("live", "precomputed")
+    live.pop("source")
+    precomputed.pop("source")
+    return live, precomputed
+
+
+@pytest.mark.parametrize("category", [None, "Home"])
+def test_uncategorized_products_counted_alike(scratch_db, monkeypatch, category):
+    db = scratch_db
+    db.add_all([
+        Product(id="p1", name="Lamp", price=10.0, category="Home", stock=1),
+        Product(id="p2", name="Mystery", price=10.0, category=None, stock=1),
+        Product(id="p3", name="Blank", price=500.0, category="", stock=1),
+    ])
+    db.commit()
+    live, precomputed = _live_and_precomputed(db, monkeypatch, category=category)
+    assert precomputed == live
+    assert [c["name"] for c in precomputed["categories"]] == ["Home"]
+
+
+def test_empty_catalog_built_once(scratch_db, monkeypatch):
+    db = scratch_db
+    monkeypatch.setattr(settings, "facets_precomputed", True)
+    refreshes = []
+    refresh = facets.refresh_facets
+    monkeypatch.setattr(facets, "refresh_facets", lambda session: refreshes.append(1) or refresh(session))
+
+    assert facets.compute_facets(db)["total"] == 0
+    assert facets.compute_facets(db)["total"] == 0
+    assert len(refreshes) == 1
+
+    # Writes after an empty build still reach the table
+    db.add(Product(id="p1", name="Lamp", price=10.0, category=None, stock=1))
+    facets.adjust_facets(db, None, (None, 10.0))
+    db.commit()
+    assert facets.compute_facets(db)["total"] == 1
+    assert len(refreshes) == 1
@@ -0,0 +1,24 @@
+"""Precomputed tables are built once, even when the build comes out empty."""
+from app import featured
+from app.models import FeaturedProduct, Product
+
+
+def test_empty_featured_ranking_is_not_rebuilt(scratch_db, monkeypatch):
+    db = scratch_db
+    db.add(Product(id="p1", name="Sold out", price=1.0, rating=5.0, stock=0))
+    db.commit()
+    refreshes = []
+    refresh = featured.refresh_featured
+    monkeypatch.setattr(featured, "refresh_featured", lambda session: refreshes.append(1) or refresh(session))
+
+    assert featured.featured_products(db, 3) == []
+    assert featured.featured_products(db, 3) == []
+    assert len(refreshes) == 1
+    assert db.query(FeaturedProduct).count() == 0
+
+
+def test_featured_limit_capped_at_ranking_size(client):
+    from app.config import settings
+
+    assert client.get(f"/api/v1/products/featured?limit={settings.featured_size}").status_code == 200
+    assert client.get(f"/api/v1/products/featured?limit={settings.featured_size + 1}").status_code == 422
@@ -0,0 +1,58 @@
+"""Cursor pagination walks the same rows, in the same order, as page mode."""
+import pytest
+
+from app.database import SessionLocal
+from app.models import Product
+
+SORTS = [(field, order) for field in ("name", "price", "rating") for order in ("asc", "desc")]
+
+
+@pytest.fixture(scope="module")
+def products_with_nulls(client):
+    """Products whose name, price and rating are NULL or the value NULL sorts as,
+    with interleaved ids, so the tie-break order tells the two apart"""
+    rows = [
+        Product(id=f"null_{n}", name=None if n % 2 else "", description="", price=None if n % 2 else 0.0,
+                category="Test", image_url=None, stock=1, rating=None if n % 2 else 0.0)
+        for n in range(6)
+    ]
+    db = SessionLocal()
+    try:
+        db.add_all(rows)
+        db.commit()
+        yield [row.id for row in rows]
+        db.query(Product).filter(Product.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _page_mode(client, sort_by, sort_order, limit):
+    ids, page = [], 1
+    while True:
+        body = client.get(f"/api/v1/products/?sort_by={sort_by}&sort_order={sort_order}&limit={limit}&page={page}").json()
+        ids += [product["id"] for product in body["products"]]
+        if not body["has_next"]:
+            return ids
+        page += 1
+
+
+def _cursor_mode(client, sort_by, sort_order, limit, max_pages=100):
+    url = f"/api/v1/products/?sort_by={sort_by}&sort_order={sort_order}&limit={limit}"
+    body = client.get(url).json()
+    ids = [product["id"] for product in body["products"]]
+    for _ in range(max_pages):
+        if not body["next_cursor"]:
+            return ids
+        body = client.get(f"{url}&cursor={body['next_cursor']}").json()
+        ids += [product["id"] for product in body["products"]]
+    pytest.fail(f"cursor pagination did not end after {max_pages} pages")
+
+
+@pytest.mark.parametrize("sort_by,sort_order", SORTS)
+def test_cursor_pages_match_page_mode(client, products_with_nulls, sort_by, sort_order):
+    page_ids = _page_mode(client, sort_by, sort_order, limit=3)
+    cursor_ids = _cursor_mode(client, sort_by, sort_order, limit=3)
+    assert set(products_with_nulls) <= set(page_ids)
+    assert len(page_ids) == len(set(page_ids))
+    assert cursor_ids == page_ids
@@ -0,0 +1,56 @@
+"""Per-endpoint SQL statement budgets: an N+1 regression fails here."""
+import itertools
+
+import pytest
+
+from app.routers import orders as orders_router
+
+SHIPPING = {
+    "first_name": "Test", "last_name": "User", "address": "1 Main St", "city": "Springfield",
+    "state": "IL", "zip_code": "62701", "phone": "555-0100",
+}
+
+
+@pytest.fixture(scope="module")
+def orders(client, user_headers):
+    """Three orders of three items each for user_1"""
+    product_ids = [product["id"] for product in client.get("/api/v1/products/?limit=3").json()["products"]]
+    # Order ids embed the current second; three orders in one second would collide
+    numbers = itertools.count(1)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(orders_router, "generate_order_id", lambda: f"order_test_{next(numbers)}")
+        for _ in range(3):
+            for product_id in product_ids:
+                response = client.post("/api/v1/cart/add", json={"product_id": product_id, "quantity": 1}, headers=user_headers)
+                assert response.status_code == 200, response.text
+            response = client.post("/api/v1/orders/", json={"shipping_address": SHIPPING}, headers=user_headers)
+            assert response.status_code == 200, response.text
+    return product_ids
+
+
+def test_user_orders_budget(client, user_headers, orders, budget):
+    with budget(3, max_repeats=1):
+        response = client.get("/api/v1/orders/", headers=user_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert all(len(order["items"]) == 3 for order in body["orders"])
+    assert body["orders"][0]["shipping_address"] == {**SHIPPING, "country": "USA"}
+
+
+def test_user_orders_paged_in_sql(client, user_headers, orders, budget):
+    with budget(3, max_repeats=1):
+        response = client.get("/api/v1/orders/?page=2&limit=2", headers=user_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert len(body["orders"]) == 1
+
+
+def test_admin_orders_budget(client, admin_headers, orders, budget):
+    with budget(5, max_repeats=1):
+        response = client.get("/api/v1/admin/orders", headers=admin_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) >= 3
+    assert all(len(order["items"]) == 3 for order in body)
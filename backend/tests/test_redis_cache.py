@@ -0,0 +1,82 @@
+"""RedisCacheBackend against fakeredis: tags, clear, errors as misses, and
+no blocking Redis calls on the event loop."""
+import threading
+
+import fakeredis
+import pytest
+import redis
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+from app.cache import RedisCacheBackend
+
+
+@pytest.fixture
+def cache():
+    return RedisCacheBackend("test", ttl=60, client=fakeredis.FakeRedis())
+
+
+def test_get_set(cache):
+    assert cache.get("a") is None
+    cache.set("a", b"1")
+    assert cache.get("a") == b"1"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_invalidate_tags(cache):
+    cache.set("list", b"1", ["catalog"])
+    cache.set("product", b"2", ["product:p1"])
+    cache.set("other", b"3", ["product:p2"])
+    assert cache.invalidate_tags(["catalog", "product:p1"]) == 2
+    assert cache.get("list") is None
+    assert cache.get("product") is None
+    assert cache.get("other") == b"3"
+
+
+def test_clear_only_own_namespace():
+    client = fakeredis.FakeRedis()
+    cache = RedisCacheBackend("test", ttl=60, client=client)
+    neighbour = RedisCacheBackend("other", ttl=60, client=client)
+    cache.set("a", b"1", ["catalog"])
+    neighbour.set("a", b"2")
+    assert cache.clear() == 2  # the entry and its tag set
+    assert cache.get("a") is None
+    assert neighbour.get("a") == b"2"
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("down")
+        return fail
+
+
+def test_errors_are_misses():
+    cache = RedisCacheBackend("test", ttl=60, client=BrokenRedis())
+    cache.set("a", b"1", ["catalog"])
+    assert cache.get("a") is None
+    assert cache.invalidate_tags(["catalog"]) == 0
+    assert cache.clear() == 0
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["errors"] == 4
+
+
+class ThreadRecordingRedis(fakeredis.FakeRedis):
+    def get(self, name):
+        self.thread = threading.get_ident()
+        return super().get(name)
+
+
+@pytest.mark.anyio
+async def test_calls_leave_the_event_loop():
+    client = ThreadRecordingRedis()
+    cache = RedisCacheBackend("test", ttl=60, client=client)
+    loop_thread = threading.get_ident()
+
+    # As from a run_in_session handler
+    await greenlet_spawn(cache.get, "a")
+    assert client.thread != loop_thread
+
+    await cache.get_async("a")
+    assert client.thread != loop_thread
@@ -0,0 +1,78 @@
+"""Read routing across two SQLite replica files: round-robin, ejection and
+read-your-writes."""
+import os
+
+import pytest
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app import replicas
+from app.routers.auth import create_access_token
+
+PRIMARY = os.environ["DATABASE_URL"][len("sqlite:///"):]
+
+
+@pytest.fixture
+def replica_files(tmp_path, monkeypatch):
+    paths = [str(tmp_path / "replica-1.db"), str(tmp_path / "replica-2.db")]
+    replica_set = replicas.ReplicaSet([f"sqlite:///{path}" for path in paths])
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    monkeypatch.setattr(replicas, "recent_writes", replicas.create_cache("read-your-writes-test", ttl=60))
+    return replica_set, paths
+
+
+def _request(user_id=None):
+    headers = []
+    if user_id:
+        headers.append((b"authorization", f"Bearer {create_access_token({'sub': user_id})}".encode()))
+    return Request({"type": "http", "headers": headers})
+
+
+async def _read_from(request) -> str:
+    """Database file the session from get_read_db runs its query on"""
+    dependency = replicas.get_read_db(request)
+    db = await dependency.__anext__()
+    try:
+        return await db.run_sync(lambda session: session.execute(text("SELECT 1")) and session.get_bind().url.database)
+    finally:
+        await dependency.aclose()
+
+
+@pytest.mark.anyio
+async def test_round_robin(replica_files):
+    replica_set, paths = replica_files
+    assert [await _read_from(_request()) for _ in range(4)] == paths * 2
+    assert [replica.reads for replica in replica_set.replicas] == [2, 2]
+    assert replica_set.primary_reads == 0
+
+
+@pytest.mark.anyio
+async def test_ejected_replicas_fall_back_to_primary(replica_files):
+    replica_set, paths = replica_files
+    replica_set.replicas[0].eject(ConnectionError("down"))
+    assert [await _read_from(_request()) for _ in range(2)] == [paths[1]] * 2
+
+    replica_set.replicas[1].eject(ConnectionError("down"))
+    assert await _read_from(_request()) == PRIMARY
+    assert replica_set.primary_reads == 1
+
+
+@pytest.mark.anyio
+async def test_failed_connect_ejects_replica(tmp_path, monkeypatch):
+    replica_set = replicas.ReplicaSet([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    with pytest.raises(Exception):
+        await _read_from(_request())
+    assert not replica_set.replicas[0].healthy
+    assert await _read_from(_request()) == PRIMARY
+
+
+@pytest.mark.anyio
+async def test_recent_writer_reads_from_primary(replica_files):
+    replica_set, paths = replica_files
+    replicas.mark_recent_write("user_1")
+    assert await _read_from(_request("user_1")) == PRIMARY
+    assert replica_set.sticky_reads == 1
+    # Other users and anonymous reads keep using the replicas
+    assert await _read_from(_request("user_2")) == paths[0]
+    assert await _read_from(_request()) == paths[1]